@@ -6,14 +6,21 @@ Flet 0.80+ GUI with real KWP1281 protocol and demo mode.
 
 import flet as ft
 import serial.tools.list_ports
+import os
 import time
 import threading
 
 from kwp1281.constants import ECUS, CCU_ACTUATORS
 from kwp1281.demo import DemoProtocol
-from kwp1281.protocol import KWP1281Protocol
+from kwp1281.protocol import KWP1281Protocol, ConnectionLostError
+from kwp1281.poller import LivePoller
+from kwp1281.recorder import Recorder
+from kwp1281.logring import LogRing
 
 VERSION = "2.0"
+RECORDINGS_DIR = os.path.join(os.path.expanduser("~"), "911OT-KKL", "recordings")
+LOG_VIEW_LINES = 500        # lines shown in the Log tab (older ones are dropped)
+UI_REFRESH_HZ = 20          # max UI updates per second, however many threads change it
 
 # ── Palette ──
 BG       = "#0d1117"
@@ -57,19 +64,71 @@ def main(page: ft.Page):
         expand=True,
     )
 
+    # Background threads never call page.update() themselves: they change
+    # controls and mark them dirty, and one UI thread sends the dirty set to
+    # the client at most UI_REFRESH_HZ times per second. Log lines (protocol
+    # blocks stay raw bytes until shown) go into a bounded ring that is
+    # rendered once per refresh.
+    log_ring = LogRing(LOG_VIEW_LINES)
+    ui = {"controls": {}, "page": False, "log": False,
+          "lock": threading.Lock(), "wake": threading.Event()}
+
+    def mark_dirty(*controls):
+        """Queue controls for the next refresh; no controls = whole page."""
+        with ui["lock"]:
+            if controls:
+                for c in controls:
+                    ui["controls"][id(c)] = c
+            else:
+                ui["page"] = True
+        ui["wake"].set()
+
     def log(msg):
-        ts = time.strftime("%H:%M:%S")
-        log_field.value = (log_field.value + "\n" if log_field.value else "") + f"[{ts}] {msg}"
+        log_ring.append(msg)
+        with ui["lock"]:
+            ui["log"] = True
+        ui["wake"].set()
+
+    def recover(ex):
+        """After a lost ECU session, reconnect from the calling worker thread.
+
+        The protocol tries an ACK probe first (tens of ms), then a full init.
+        """
+        if (not isinstance(ex, ConnectionLostError) or not state["connected"]
+                or proto[0] is None):
+            return
+        log("Connection lost, reconnecting...")
         try:
-            page.update()
-        except Exception:
-            pass
+            proto[0].reconnect()
+            log("Reconnected")
+        except Exception as rex:
+            log(f"Reconnect failed: {rex}")
+            do_disconnect()
 
-    def safe_update():
-        try:
-            page.update()
-        except Exception:
-            pass
+    def _ui_refresh_loop():
+        interval = 1.0 / UI_REFRESH_HZ
+        while True:
+            ui["wake"].wait()
+            ui["wake"].clear()
+            with ui["lock"]:
+                controls, ui["controls"] = list(ui["controls"].values()), {}
+                full, ui["page"] = ui["page"], False
+                log_changed, ui["log"] = ui["log"], False
+            if log_changed:
+                log_field.value = log_ring.render()
+                controls.append(log_field)
+            try:
+                if not full:
+                    for c in controls:
+                        c.update()
+            except Exception:
+                full = True  # e.g. a control not on the page yet
+            if full:
+                try:
+                    page.update()
+                except Exception:
+                    pass
+            time.sleep(interval)
 
     # ══════════════════════════════════════
     #  ABOUT DIALOG
@@ -168,6 +227,11 @@ def main(page: ft.Page):
     )
     on_model_change(None)
 
+    echo_cb = ft.Checkbox(
+        label="Echo (dumb cable)", value=False,
+        label_style=ft.TextStyle(size=12, color=DIM),
+    )
+
     btn_connect = ft.Button(
         content="Connect", bgcolor=GREEN, color=BG,
         width=130, height=38,
@@ -186,6 +250,8 @@ def main(page: ft.Page):
             ft.Row([
                 ft.Text("ECU", size=12, color=DIM, width=50),
                 ecu_dd,
+                ft.Container(width=16),
+                echo_cb,
                 ft.Container(expand=True),
                 btn_connect,
             ], vertical_alignment=ft.CrossAxisAlignment.CENTER, spacing=8),
@@ -258,7 +324,7 @@ def main(page: ft.Page):
             for i, (c, d, n) in enumerate(fault_data):
                 fault_list.controls.append(
                     _build_fault_row(c, d, n, i, selected=(i == fault_selected[0])))
-        safe_update()
+        mark_dirty(fault_list)
 
     def _fault_key_nav(e: ft.KeyboardEvent):
         """Handle up/down arrow keys in fault list."""
@@ -280,6 +346,7 @@ def main(page: ft.Page):
             try:
                 faults = proto[0].read_faults()
             except Exception as ex:
+                recover(ex)
                 log(f"Error reading faults: {ex}")
                 return
 
@@ -294,6 +361,7 @@ def main(page: ft.Page):
                 fault_status.value = "No faults stored"
                 fault_status.color = GREEN
             log(f"Found {len(faults)} fault code(s)")
+            mark_dirty(fault_status)
             _refresh_fault_list()
 
         threading.Thread(target=_do, daemon=True).start()
@@ -307,6 +375,7 @@ def main(page: ft.Page):
             try:
                 ok = proto[0].clear_faults()
             except Exception as ex:
+                recover(ex)
                 log(f"Error clearing faults: {ex}")
                 return
             if ok:
@@ -319,6 +388,7 @@ def main(page: ft.Page):
                 fault_status.value = "Clear faults failed"
                 fault_status.color = RED
                 log("Clear faults: ECU returned NAK")
+            mark_dirty(fault_status)
             _refresh_fault_list()
 
         threading.Thread(target=_do, daemon=True).start()
@@ -358,6 +428,10 @@ def main(page: ft.Page):
 
     gauge_rows = ft.Column(spacing=0, scroll=ft.ScrollMode.AUTO, expand=True)
     live_status = ft.Text("", size=12, color=DIM, italic=True)
+    record_cb = ft.Checkbox(
+        label="Record", value=False,
+        label_style=ft.TextStyle(size=12, color=DIM),
+    )
 
     btn_live_start = ft.Button(
         content="Start", bgcolor=GREEN, color=BG,
@@ -398,7 +472,7 @@ def main(page: ft.Page):
         btn_live_start.disabled = True
         btn_live_stop.disabled = False
         live_status.value = "Polling..."
-        safe_update()
+        mark_dirty(btn_live_start, btn_live_stop, live_status)
         threading.Thread(target=_live_loop, daemon=True).start()
 
     def stop_live(e):
@@ -407,39 +481,67 @@ def main(page: ft.Page):
         btn_live_start.disabled = False
         btn_live_stop.disabled = True
         live_status.value = "Stopped"
-        safe_update()
+        mark_dirty(btn_live_start, btn_live_stop, live_status)
 
     btn_live_start.on_click = start_live
     btn_live_stop.on_click = stop_live
 
-    def _live_loop():
-        while state["connected"] and state["live_running"]:
-            try:
-                results = proto[0].read_live_values()
-            except Exception as ex:
-                log(f"Live data error: {ex}")
-                break
+    def _open_recorder():
+        """Create a new recording file for the connected ECU, or None."""
+        if not record_cb.value:
+            return None
+        p = proto[0]
+        os.makedirs(RECORDINGS_DIR, exist_ok=True)
+        name = f"{p.model}_{p.ecu_address:02X}_{time.strftime('%Y%m%d_%H%M%S')}.kkl"
+        path = os.path.join(RECORDINGS_DIR, name)
+        log(f"Recording to {path}")
+        return Recorder(path, model=p.model, start=time.time())
 
-            for name, val, unit, formatted, ratio in results:
-                if name in gauges:
-                    bar, lbl = gauges[name]
+    def _live_loop():
+        try:
+            recorder = _open_recorder()
+        except OSError as ex:
+            log(f"Recording disabled: {ex}")
+            recorder = None
+        poller = LivePoller(proto[0], recorder=recorder)
+        units = {p[0]: p[5] for p in poller.params}
+        shown = {}  # name -> timestamp of the sample on screen
+        poller.start()
+
+        while state["connected"] and state["live_running"] and poller.running:
+            for name, sample in poller.ring.latest().items():
+                if name not in gauges or shown.get(name) == sample.t:
+                    continue
+                shown[name] = sample.t
+                lut = poller.luts[name]
+                ratio = lut.ratios[sample.raw]
+                bar, lbl = gauges[name]
+                text = f"{lut.text[sample.raw]} {units[name]}"
+                if bar.value != ratio:
                     bar.value = ratio
                     bar.color = RED if ratio > 0.85 else (YELLOW if ratio > 0.7 else ACCENT)
-                    lbl.value = f"{formatted} {unit}"
-
-            safe_update()
-            time.sleep(0.3)
-
+                    mark_dirty(bar)
+                if lbl.value != text:
+                    lbl.value = text
+                    mark_dirty(lbl)
+
+            time.sleep(1.0 / UI_REFRESH_HZ)
+
+        poller.stop()
+        if recorder is not None:
+            recorder.close()
+        if poller.error is not None:
+            log(f"Live data error: {poller.error}")
         state["live_running"] = False
         btn_live_start.disabled = not state["connected"]
         btn_live_stop.disabled = True
         live_status.value = "Stopped"
-        safe_update()
+        mark_dirty(btn_live_start, btn_live_stop, live_status)
 
     live_panel = ft.Column([
         gauge_rows,
         ft.Divider(height=1, color=BORDER),
-        ft.Row([btn_live_start, btn_live_stop, ft.Container(expand=True), live_status],
+        ft.Row([btn_live_start, btn_live_stop, record_cb, ft.Container(expand=True), live_status],
                vertical_alignment=ft.CrossAxisAlignment.CENTER, spacing=8),
     ], spacing=8, expand=True)
 
@@ -467,6 +569,7 @@ def main(page: ft.Page):
                         else:
                             log(f"Actuator #{num:02d} no response")
                     except Exception as ex:
+                        recover(ex)
                         log(f"Actuator #{num:02d} error: {ex}")
                 threading.Thread(target=_do, daemon=True).start()
             return handler
@@ -516,21 +619,22 @@ def main(page: ft.Page):
                 grp = int(grp_input.value)
             except ValueError:
                 grp_result.value = "Invalid group number"
-                safe_update()
+                mark_dirty(grp_result)
                 return
             log(f"ReadGroup {grp}...")
             try:
                 vals = proto[0].read_group(grp)
             except Exception as ex:
+                recover(ex)
                 grp_result.value = f"Error: {ex}"
-                safe_update()
+                mark_dirty(grp_result)
                 return
             lines = []
             for i, (f_id, va, vb) in enumerate(vals):
                 val16 = (va << 8) | vb
                 lines.append(f"  [{i+1}] formula={f_id:3d}  a=0x{va:02X}  b=0x{vb:02X}  (val={val16})")
             grp_result.value = "\n".join(lines) if lines else "No data"
-            safe_update()
+            mark_dirty(grp_result)
         threading.Thread(target=_do, daemon=True).start()
 
     btn_grp = ft.Button(content="Read", bgcolor=ACCENT, color=BG, height=30, disabled=True,
@@ -550,17 +654,18 @@ def main(page: ft.Page):
                 ch = int(adc_input.value)
             except ValueError:
                 adc_result.value = "Invalid channel"
-                safe_update()
+                mark_dirty(adc_result)
                 return
             log(f"ADC read ch={ch}...")
             try:
                 val = proto[0].read_adc(ch)
             except Exception as ex:
+                recover(ex)
                 adc_result.value = f"Error: {ex}"
-                safe_update()
+                mark_dirty(adc_result)
                 return
             adc_result.value = f"  Channel {ch}: {val}" if val is not None else "  No response"
-            safe_update()
+            mark_dirty(adc_result)
         threading.Thread(target=_do, daemon=True).start()
 
     btn_adc = ft.Button(content="Read", bgcolor=ACCENT, color=BG, height=30, disabled=True,
@@ -583,18 +688,19 @@ def main(page: ft.Page):
                 plo = int(login_pin_lo.value, 16)
             except ValueError:
                 login_result.value = "Invalid hex PIN"
-                safe_update()
+                mark_dirty(login_result)
                 return
             log(f"Login {phi:02X}{plo:02X}...")
             try:
                 ok = proto[0].login(phi, plo)
             except Exception as ex:
+                recover(ex)
                 login_result.value = f"Error: {ex}"
-                safe_update()
+                mark_dirty(login_result)
                 return
             login_result.value = "Login OK" if ok else "Login FAILED"
             login_result.color = GREEN if ok else RED
-            safe_update()
+            mark_dirty(login_result)
         threading.Thread(target=_do, daemon=True).start()
 
     btn_login = ft.Button(content="Login", bgcolor=ACCENT, color=BG, height=30, disabled=True,
@@ -616,14 +722,15 @@ def main(page: ft.Page):
                 ch = int(adapt_ch.value)
             except ValueError:
                 adapt_result.value = "Invalid channel"
-                safe_update()
+                mark_dirty(adapt_result)
                 return
             log(f"ReadAdapt ch={ch}...")
             try:
                 result = proto[0].read_adaptation(ch)
             except Exception as ex:
+                recover(ex)
                 adapt_result.value = f"Error: {ex}"
-                safe_update()
+                mark_dirty(adapt_result)
                 return
             if result:
                 ch_r, val = result
@@ -631,7 +738,7 @@ def main(page: ft.Page):
                 adapt_val.value = str(val)
             else:
                 adapt_result.value = "  No response"
-            safe_update()
+            mark_dirty(adapt_result, adapt_val)
         threading.Thread(target=_do, daemon=True).start()
 
     def adapt_write_click(e):
@@ -643,18 +750,19 @@ def main(page: ft.Page):
                 val = int(adapt_val.value)
             except ValueError:
                 adapt_result.value = "Invalid channel or value"
-                safe_update()
+                mark_dirty(adapt_result)
                 return
             log(f"WriteAdapt ch={ch} val={val}...")
             try:
                 ok = proto[0].write_adaptation(ch, val)
             except Exception as ex:
+                recover(ex)
                 adapt_result.value = f"Error: {ex}"
-                safe_update()
+                mark_dirty(adapt_result)
                 return
             adapt_result.value = f"  Write {'OK' if ok else 'FAILED'}"
             adapt_result.color = GREEN if ok else RED
-            safe_update()
+            mark_dirty(adapt_result)
         threading.Thread(target=_do, daemon=True).start()
 
     btn_adapt_read = ft.Button(content="Read", bgcolor=ACCENT, color=BG, height=30, disabled=True,
@@ -816,17 +924,18 @@ def main(page: ft.Page):
             elif new_state == "connecting":
                 status_dot.color = YELLOW
                 status_label.value = "Connecting..."
-            safe_update()
+            mark_dirty(status_dot, status_label)
 
         if is_demo:
             proto[0] = DemoProtocol(on_log=log, on_state_change=on_state_change)
         else:
-            proto[0] = KWP1281Protocol(on_log=log, on_state_change=on_state_change)
+            proto[0] = KWP1281Protocol(on_log=log, on_state_change=on_state_change,
+                                       local_echo=bool(echo_cb.value), on_block=log)
 
         # UI: disable connect button during connection
         btn_connect.disabled = True
         btn_connect.content = "Connecting..."
-        safe_update()
+        mark_dirty(btn_connect)
 
         def _do_connect():
             try:
@@ -860,6 +969,8 @@ def main(page: ft.Page):
                 _build_gauges(params)
 
                 log(f"Connected to {model} {ecu_name}")
+                mark_dirty(btn_connect, btn_read, btn_clear, btn_live_start,
+                           *act_btns, *adv_btns, demo_badge, info_label, gauge_rows)
 
             except Exception as ex:
                 log(f"Connection failed: {ex}")
@@ -867,8 +978,7 @@ def main(page: ft.Page):
                 btn_connect.bgcolor = GREEN
                 btn_connect.color = BG
                 btn_connect.disabled = False
-
-            safe_update()
+                mark_dirty(btn_connect)
 
         threading.Thread(target=_do_connect, daemon=True).start()
 
@@ -901,7 +1011,8 @@ def main(page: ft.Page):
             demo_badge.visible = False
 
             log("Disconnected")
-            safe_update()
+            mark_dirty(btn_connect, btn_read, btn_clear, btn_live_start, btn_live_stop,
+                       *act_btns, *adv_btns, info_label, demo_badge)
 
         threading.Thread(target=_do, daemon=True).start()
 
@@ -923,6 +1034,8 @@ def main(page: ft.Page):
         statusbar,
     ], spacing=0, expand=True))
 
+    threading.Thread(target=_ui_refresh_loop, daemon=True, name="ui-refresh").start()
+
     log("911OT-KKL Scanner ready")
     log("Select port and model, then click Connect")
     log("Use 'Demo' port for simulated data without hardware")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Block I/O benchmark - per-byte vs batched KLineSerial paths.
+
+Runs a minimal fake ECU on a Linux pseudo-terminal that ACKs every byte of
+a tool block with its complement and answers with an ACK block. The same
+exchange is timed through the original per-byte calls and through
+send_block_with_acks()/recv_block_with_acks().
+
+With --echo the fake ECU also plays the wire: every byte the tool writes is
+echoed back before the ECU reply, as on a single-wire K-Line interface.
+
+Usage:
+    python benchmarks/bench_block_io.py [--seconds 3] [--echo]
+"""
+
+import os
+import sys
+import time
+import tty
+import argparse
+import threading
+
+import serial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kwp1281.constants import CMD_ACK, ETX, INTERBYTE_TIMEOUT  # noqa: E402
+from kwp1281.serial_port import KLineSerial  # noqa: E402
+
+
+class FakeEcu:
+    """Answers every received block with an ACK block, ACKing byte by byte."""
+
+    def __init__(self, echo=False):
+        self._echo = echo
+        self._master, slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self._slave = slave
+        self._stop = threading.Event()
+        self._counter = 0
+        self._thread = threading.Thread(target=self._run, daemon=True, name="fake-ecu")
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _read(self):
+        b = os.read(self._master, 1)[0]
+        if self._echo:
+            os.write(self._master, bytes([b]))
+        return b
+
+    def _write(self, b):
+        os.write(self._master, bytes([b]))
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                # Receive tool block, ACK all but ETX
+                length = self._read()
+                self._write(length ^ 0xFF)
+                for i in range(1, length):
+                    b = self._read()
+                    if i < length - 1:
+                        self._write(b ^ 0xFF)
+                    else:
+                        self._counter = (self._counter + 1) & 0xFF
+
+                # Answer with ACK block, wait for complements
+                block = bytes([0x04, self._counter, CMD_ACK, ETX])
+                for i, b in enumerate(block):
+                    self._write(b)
+                    if i < len(block) - 1:
+                        self._read()
+                self._counter = (self._counter + 1) & 0xFF
+        except OSError:
+            pass
+
+
+def _open_kline(port, echo=False):
+    """Open a KLineSerial on a pty (no modem lines, so skip open())."""
+    kline = KLineSerial(local_echo=echo)
+    kline._ser = serial.Serial(port=port, baudrate=9600, timeout=INTERBYTE_TIMEOUT)
+    return kline
+
+
+def _exchange_per_byte(kline, block):
+    for i, b in enumerate(block):
+        if i < len(block) - 1:
+            kline.send_byte_with_ack(b)
+        else:
+            kline.write_byte(b)
+    length = kline.recv_byte_with_ack()
+    for i in range(1, length):
+        if i < length - 1:
+            kline.recv_byte_with_ack()
+        else:
+            kline.read_byte(timeout=INTERBYTE_TIMEOUT)
+
+
+def _exchange_block(kline, block):
+    kline.send_block_with_acks(block)
+    kline.recv_block_with_acks()
+
+
+def run(seconds, echo=False):
+    """Time both paths, return {name: blocks_per_second}."""
+    results = {}
+    for name, fn in (("per_byte", _exchange_per_byte), ("block", _exchange_block)):
+        ecu = FakeEcu(echo=echo)
+        ecu.start()
+        kline = _open_kline(ecu.port, echo=echo)
+        counter = 0
+        blocks = 0
+        t0 = time.perf_counter()
+        deadline = t0 + seconds
+        while time.perf_counter() < deadline:
+            fn(kline, bytes([0x04, counter, CMD_ACK, ETX]))
+            counter = (counter + 2) & 0xFF
+            blocks += 2
+        elapsed = time.perf_counter() - t0
+        kline.close()
+        ecu.stop()
+        results[name] = blocks / elapsed
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0, help="duration per path")
+    parser.add_argument("--echo", action="store_true", help="single-wire local echo")
+    args = parser.parse_args()
+
+    results = run(args.seconds, echo=args.echo)
+    for name, rate in results.items():
+        print(f"{name:10s} {rate:10.0f} blocks/s")
+    print(f"speedup    {results['block'] / results['per_byte']:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Protocol hot-path micro-benchmarks with a machine-readable JSON report.
+
+Covers block framing (_send_block/_recv_block over an in-memory serial
+double, with and without an on_block consumer), fault parsing on maximal
+0xFC payloads, read_group decoding, formula conversions, fault code
+lookups (cold and warm) and a full read_live_values() sweep.
+
+Usage:
+    python benchmarks/bench_micro.py [--json report.json] [--min-time 0.2]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kwp1281 import fault_codes, formulas  # noqa: E402
+from kwp1281.constants import CMD_ACK  # noqa: E402
+from kwp1281.logring import LogRing  # noqa: E402
+from kwp1281.protocol import KWP1281Protocol  # noqa: E402
+from memory_serial import MemorySerial, MAX_FAULT_PAYLOAD  # noqa: E402
+
+
+def _measure(fn, min_time):
+    """Run fn repeatedly for at least min_time seconds. Returns (n, seconds)."""
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            return n, elapsed
+        n *= 2 if elapsed <= 0 else max(2, int(min_time / elapsed * 1.2))
+
+
+def _proto(model="964", address=0x10, on_block=None):
+    proto = KWP1281Protocol(on_block=on_block)
+    proto._kline._ser = MemorySerial()
+    proto.model = model
+    proto.ecu_address = address
+    proto.connected = True
+    return proto
+
+
+def _cases():
+    """Return list of (name, callable) benchmarks."""
+    proto = _proto()
+    logged = _proto(on_block=LogRing(1000).append)
+
+    def block_exchange():
+        proto._send_block(CMD_ACK)
+        proto._recv_block()
+
+    def block_exchange_logged():
+        logged._send_block(CMD_ACK)
+        logged._recv_block()
+
+    def fault_lookup_cold():
+        fault_codes._DB.clear()
+        fault_codes._TABLES.clear()
+        fault_codes.lookup_for_ecu("964", 0x10, 21)
+
+    params = formulas.get_live_params("964", 0x10)
+    live_regs = [p[1] for p in params]
+
+    return [
+        ("block_exchange_ack", block_exchange),
+        ("block_exchange_logged", block_exchange_logged),
+        ("parse_faults_max", lambda: proto._parse_faults(MAX_FAULT_PAYLOAD)),
+        ("read_faults_max", proto.read_faults),
+        ("read_group", lambda: proto.read_group(1)),
+        ("read_value", lambda: proto.read_value(0x3A)),
+        ("read_values_stream_live", lambda: proto.read_values_stream(live_regs)),
+        ("read_live_values", proto.read_live_values),
+        ("convert_value", lambda: formulas.convert_value(0x3A, 21, "964")),
+        ("convert_adc", lambda: formulas.convert_adc(1, 92, "964")),
+        ("fault_lookup_cold", fault_lookup_cold),
+        ("fault_lookup_warm", lambda: fault_codes.lookup_for_ecu("964", 0x10, 21)),
+    ]
+
+
+def run(min_time=0.2, only=None):
+    """Run all benchmarks. Returns the report dict."""
+    results = {}
+    for name, fn in _cases():
+        if only and name not in only:
+            continue
+        n, elapsed = _measure(fn, min_time)
+        results[name] = {
+            "n": n,
+            "seconds": elapsed,
+            "us_per_op": elapsed / n * 1e6,
+            "ops_per_s": n / elapsed,
+        }
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", metavar="PATH", help="write the JSON report here ('-' = stdout)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per benchmark")
+    parser.add_argument("only", nargs="*", help="benchmark names to run (default: all)")
+    args = parser.parse_args()
+
+    report = run(args.min_time, args.only)
+
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    for name, r in report["results"].items():
+        print(f"{name:26s} {r['us_per_op']:12.2f} us/op {r['ops_per_s']:14.0f} ops/s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""End-to-end live data benchmark against the pty virtual ECU.
+
+Connects the real KWP1281Protocol to kwp1281.virtual_ecu (5-baud init,
+handshake, ident) and measures live-data samples per second with one
+read_value() per register versus chained read_values_stream() sweeps,
+at the Motronic's modeled baud rate.
+
+Usage:
+    python benchmarks/bench_virtual_ecu.py [--model 964] [--seconds 5] [--no-timing]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kwp1281.constants import ECUS  # noqa: E402
+from kwp1281.formulas import get_live_params  # noqa: E402
+from kwp1281.protocol import KWP1281Protocol  # noqa: E402
+from kwp1281.virtual_ecu import VirtualECU  # noqa: E402
+
+
+def _sweep_single(proto, registers):
+    for reg in registers:
+        proto.read_value(reg)
+
+
+def _sweep_stream(proto, registers):
+    proto.read_values_stream(registers)
+
+
+def run(model, seconds, wire_timing=True):
+    """Return {name: samples_per_second} for both sweep styles."""
+    name, address, baud = ECUS[model][0]
+    registers = [p[1] for p in get_live_params(model, address)]
+    results = {}
+
+    with VirtualECU(model, wire_timing=wire_timing) as ecu:
+        proto = KWP1281Protocol()
+        t0 = time.perf_counter()
+        proto.connect(ecu.port, model, name, address, baud)
+        results["connect_s"] = time.perf_counter() - t0
+
+        for label, sweep in (("single", _sweep_single), ("stream", _sweep_stream)):
+            samples = 0
+            t0 = time.perf_counter()
+            deadline = t0 + seconds
+            while time.perf_counter() < deadline:
+                sweep(proto, registers)
+                samples += len(registers)
+            results[label] = samples / (time.perf_counter() - t0)
+
+        proto.disconnect()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default="964", choices=("964", "993"))
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration per sweep style")
+    parser.add_argument("--no-timing", action="store_true", help="no modeled byte times")
+    args = parser.parse_args()
+
+    results = run(args.model, args.seconds, wire_timing=not args.no_timing)
+    print(f"connect    {results['connect_s']:10.2f} s")
+    print(f"single     {results['single']:10.1f} samples/s")
+    print(f"stream     {results['stream']:10.1f} samples/s")
+    print(f"speedup    {results['stream'] / results['single']:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""In-memory serial double with a synchronous KWP1281 ECU behind it.
+
+The ECU side runs inside write(): every tool byte is answered immediately
+(complement, next response byte), so KLineSerial and KWP1281Protocol can
+be timed without threads, ptys or wire time.
+"""
+
+from kwp1281.constants import (
+    CMD_ACK, CMD_VALUE_REQ, CMD_READ_FAULTS, CMD_READ_GROUP, CMD_ADC_READ,
+    RSP_ACK, RSP_NAK, RSP_BINARY_DATA, RSP_FAULT_CODES, RSP_GROUP_DATA, RSP_ADC_RESP,
+    ETX, DEMO_BASE_VALUES,
+)
+
+# 0xFC payload filling a maximal block: 255 - Len/Cnt/Title/ETX leaves 251
+# bytes, which hold 125 two-byte (code, status) entries = 250 bytes
+MAX_FAULT_PAIRS = 125
+MAX_FAULT_PAYLOAD = bytes(
+    b for i in range(MAX_FAULT_PAIRS) for b in (11 + i % 46, 0x80 | (i % 64)))
+
+
+def default_responder(title, data):
+    """Answer a tool block the way a Motronic would. Returns (title, data)."""
+    if title == CMD_ACK:
+        return RSP_ACK, b""
+    if title == CMD_VALUE_REQ and len(data) >= 3:
+        return RSP_BINARY_DATA, bytes([DEMO_BASE_VALUES.get(data[2], 128)])
+    if title == CMD_READ_FAULTS:
+        return RSP_FAULT_CODES, MAX_FAULT_PAYLOAD
+    if title == CMD_READ_GROUP:
+        return RSP_GROUP_DATA, bytes([1, 100, 0] * 4)
+    if title == CMD_ADC_READ:
+        return RSP_ADC_RESP, b"\x02\x00"
+    return RSP_NAK, b"\x00"
+
+
+class MemorySerial:
+    """pyserial stand-in: tool writes drive an ECU state machine in-process."""
+
+    def __init__(self, responder=default_responder):
+        self.responder = responder
+        self.timeout = None
+        self.write_timeout = None
+        self.baudrate = 9600
+        self.rts = False
+        self.dtr = False
+        self.is_open = True
+        self._rx = bytearray()
+        self._tool = bytearray()   # tool block being received
+        self._block = None         # ECU block being sent
+        self._pos = 0
+        self._counter = 0
+
+    def write(self, data):
+        for b in data:
+            self._feed(b)
+        return len(data)
+
+    def read(self, size=1):
+        out = bytes(self._rx[:size])
+        del self._rx[:size]
+        return out
+
+    def _feed(self, b):
+        if self._block is None:
+            # Receiving a tool block: ACK every byte but ETX
+            self._tool.append(b)
+            length = self._tool[0]
+            if len(self._tool) < length:
+                self._rx.append(b ^ 0xFF)
+                return
+            self._counter = (self._tool[1] + 1) & 0xFF
+            title, data = self.responder(self._tool[2], bytes(self._tool[3:-1]))
+            self._tool.clear()
+            self._block = bytes([len(data) + 4, self._counter, title]) + data + bytes([ETX])
+            self._counter = (self._counter + 1) & 0xFF
+            self._pos = 0
+            self._rx.append(self._block[0])
+        else:
+            # Tool ACKed block[pos]; send the next byte, ETX ends the block
+            self._pos += 1
+            self._rx.append(self._block[self._pos])
+            if self._pos == len(self._block) - 1:
+                self._block = None
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self._rx.clear()
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
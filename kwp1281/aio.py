@@ -0,0 +1,765 @@
+"""asyncio KWP1281 client - same command set as KWP1281Protocol, no threads.
+
+AsyncKLineSerial keeps the port non-blocking and feeds received bytes from
+an event loop reader callback; every wait is an awaitable with a deadline
+taken from the same adaptive timing as the threaded KLineSerial. Keep-alive
+runs as a task, and each command accepts a timeout and can be cancelled.
+A command interrupted mid-block (timeout, cancellation) leaves the ECU out
+of step, so the session is then closed and must be reconnected. After a
+failed exchange (bad complement, unexpected block) the next command first
+resynchronizes with an ACK probe, as KWP1281Protocol does.
+
+The port is watched with loop.add_reader(), so this is POSIX-only: the
+Windows Proactor event loop has no add_reader().
+
+Usage:
+    proto = AsyncKWP1281Protocol()
+    await proto.connect("/dev/ttyUSB0", "964", "Motronic M2.1", 0x10, 8800)
+    faults = await proto.read_faults(timeout=5.0)
+    await proto.disconnect()
+"""
+
+import time
+import asyncio
+
+from .constants import (
+    CMD_READ_FAULTS, CMD_CLEAR_FAULTS, CMD_END_COMM, CMD_ACK, CMD_VALUE_REQ,
+    CMD_ADC_READ, CMD_ACTUATOR, CMD_READ_GROUP, CMD_LOGIN, CMD_READ_ADAPT,
+    CMD_WRITE_ADAPT,
+    RSP_ACK, RSP_NAK, RSP_ASCII_ID, RSP_FAULT_CODES, RSP_BINARY_DATA,
+    RSP_GROUP_DATA, RSP_ADAPT_RESP, RSP_ADC_RESP,
+    ETX, SYNC_BYTE, SYNC_TIMEOUT, KEYWORD_ACK_DELAY, INTERBYTE_TIMEOUT,
+    KEEPALIVE_INTERVAL, INIT_RETRY_TIMEOUT, BAUD_CANDIDATES, BLOCK_RING_SIZE,
+    MAX_INIT_RETRIES,
+)
+from .formulas import get_live_params, get_param_lut
+from .logring import LogRing
+from .serial_port import KLineSerial, KLineError, KLineTimeoutError, match_sync
+from .protocol import KWP1281Protocol, ProtocolError, ConnectionLostError
+
+
+class AsyncKLineSerial(KLineSerial):
+    """KLineSerial driven by an asyncio event loop.
+
+    The port is opened like KLineSerial (modem lines, capture, baudrate
+    handling are shared) but read non-blocking: a loop reader callback
+    appends incoming bytes to a buffer and the coroutines below await it.
+    The byte/block I/O is provided by coroutines with an "a" prefix
+    (aread_byte, asend_block_with_acks, ...) next to the inherited blocking
+    methods, so nothing inherited ever gets a coroutine where it expects
+    bytes. Only the coroutines may be used while the loop reader owns the
+    port.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._rx = bytearray()
+        self._rx_event = asyncio.Event()
+        self._loop = None
+        self._fd = None
+
+    def open(self, port, baudrate=9600):
+        super().open(port, baudrate)
+        self._ser.timeout = 0
+        self._loop = asyncio.get_running_loop()
+        self._fd = self._ser.fileno()
+        self._loop.add_reader(self._fd, self._on_readable)
+
+    def close(self):
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._fd = None
+        super().close()
+
+    def _on_readable(self):
+        try:
+            data = self._ser.read(self._ser.in_waiting or 1)
+        except OSError:
+            data = b""
+        if data:
+            self._rx += data
+            self._rx_event.set()
+
+    def _purge(self):
+        super()._purge()
+        self._rx.clear()
+
+    async def asettle(self, quiet, limit):
+        """Discard input until the line has been quiet for `quiet` seconds.
+
+        The loop-reader counterpart of KLineSerial.settle().
+        """
+        deadline = time.monotonic() + limit
+        while True:
+            self._rx.clear()
+            await asyncio.sleep(quiet)
+            if not self._rx or time.monotonic() >= deadline:
+                self._rx.clear()
+                self._echo.clear()
+                return
+
+    # ── Byte I/O ──
+
+    async def _aread(self, n, timeout):
+        """Read n bytes after the pending echo, within timeout seconds.
+
+        Raises KLineTimeoutError on timeout, KLineError on an echo mismatch.
+        """
+        echo = self._echo
+        k = len(echo)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while len(self._rx) < k + n:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                if len(self._rx) < k:
+                    # Drop the partial echo with it, or the next read would
+                    # compare its own echo against stale bytes
+                    echo.clear()
+                    self._rx.clear()
+                    raise KLineTimeoutError("Echo timeout")
+                raise KLineTimeoutError("Read timeout")
+            # A timer wake-up rather than a nested wait_for(), which can
+            # swallow the caller's cancellation on Python < 3.12
+            self._rx_event.clear()
+            timer = loop.call_later(remaining, self._rx_event.set)
+            try:
+                await self._rx_event.wait()
+            finally:
+                timer.cancel()
+
+        if k:
+            if self._rx[:k] != echo:
+                raise KLineError(
+                    f"Echo mismatch: wrote {echo.hex(' ').upper()}, "
+                    f"read {self._rx[:k].hex(' ').upper()}")
+            echo.clear()
+        data = bytes(self._rx[k:k + n])
+        del self._rx[:k + n]
+        return data
+
+    async def aread_byte(self, timeout=INTERBYTE_TIMEOUT):
+        return (await self._aread(1, timeout))[0]
+
+    async def awrite_byte(self, b):
+        self._write(b)
+
+    async def asend_5baud_address(self, address, start_at=None):
+        """Send ECU address at 5 baud (10 bits, 2 s) without blocking the loop.
+
+        Edges follow the absolute deadlines of timeline_5baud(); their
+        lateness (event loop scheduling) is kept in self.init_report.
+        """
+        start = max(start_at or 0.0, time.monotonic())
+        timeline = self.timeline_5baud(address, start)
+        await asyncio.sleep(start - time.monotonic())
+        if self._trace is not None:
+            self._trace.record_init(address)
+
+        lateness = []
+        for deadline, level in timeline if self._modem_lines else timeline[-1:]:
+            await asyncio.sleep(deadline - time.monotonic())
+            if level is not None:
+                self._set_kline(level)
+            lateness.append(time.monotonic() - deadline)
+        self._report_5baud(lateness, start)
+
+        self._purge()
+        if not self._modem_lines:
+            # Pseudo-terminal: the address goes out as a plain byte
+            self._write(address)
+
+    async def aperform_handshake(self, baudrate, candidates=()):
+        """Sync byte and keywords, as KLineSerial.perform_handshake()."""
+        self.set_baudrate(baudrate)
+
+        sync = await self.aread_byte(timeout=SYNC_TIMEOUT)
+        if sync != SYNC_BYTE:
+            rate = None
+            if candidates:
+                await asyncio.sleep(10.0 / min(candidates))
+                data = bytes([sync]) + bytes(self._rx)
+                self._rx.clear()
+                rate = match_sync(data, baudrate, candidates)
+            if rate is None:
+                raise KLineError(f"Expected sync 0x55, got 0x{sync:02X}")
+            self.set_baudrate(rate)
+
+        kw1 = await self.aread_byte()
+        self._write(kw1 ^ 0xFF)
+
+        kw2 = await self.aread_byte()
+        await asyncio.sleep(KEYWORD_ACK_DELAY)
+        self._write(kw2 ^ 0xFF)
+        return (kw1, kw2)
+
+    # ── Block I/O ──
+
+    async def asend_block_with_acks(self, block):
+        """Send a block, awaiting the ECU's complement of every byte but ETX."""
+        timing = self.timing
+        metrics = self.metrics
+        clock = time.perf_counter
+        last = len(block) - 1
+        start = clock()
+
+        for i, b in enumerate(block):
+            t0 = clock()
+            self._write(b)
+            if i == last:
+                break
+            try:
+                ack = (await self._aread(1, timing.byte_timeout))[0]
+            except KLineTimeoutError:
+                timing.record_timeout()
+                if metrics is not None:
+                    metrics.inc("timeouts")
+                raise
+            dt = clock() - t0
+            timing.record_ack(dt)
+            if metrics is not None:
+                metrics.observe("ack_rtt", dt)
+            expected = b ^ 0xFF
+            if ack != expected:
+                if metrics is not None:
+                    metrics.inc("bad_acks")
+                raise KLineError(
+                    f"Bad ACK: sent 0x{b:02X}, expected 0x{expected:02X}, got 0x{ack:02X}")
+
+        self._tx_done = clock()
+        self._tx_title = block[2]
+        if metrics is not None:
+            metrics.observe("block_send", self._tx_done - start)
+
+    async def arecv_block_with_acks(self):
+        """Receive a block, ACKing every byte but ETX. Returns the raw block."""
+        timing = self.timing
+        metrics = self.metrics
+        clock = time.perf_counter
+
+        title = self._tx_title
+        self._tx_title = None
+        try:
+            length = (await self._aread(1, timing.response_timeout_for(title)))[0]
+        except KLineTimeoutError:
+            timing.record_timeout(response=True, title=title)
+            if metrics is not None:
+                metrics.inc("timeouts")
+            raise
+        start = clock()
+        if self._tx_done is not None:
+            timing.record_response(start - self._tx_done, title)
+            if metrics is not None:
+                metrics.observe("response", start - self._tx_done)
+            self._tx_done = None
+        if length < 4:
+            raise KLineError(f"Invalid block length 0x{length:02X}")
+
+        block = bytearray([length])
+        b = length
+        for _ in range(1, length):
+            t0 = clock()
+            self._write(b ^ 0xFF)
+            try:
+                b = (await self._aread(1, timing.byte_timeout))[0]
+            except KLineTimeoutError:
+                timing.record_timeout()
+                if metrics is not None:
+                    metrics.inc("timeouts")
+                raise
+            dt = clock() - t0
+            timing.record_ack(dt)
+            if metrics is not None:
+                metrics.observe("ack_rtt", dt)
+            block.append(b)
+        if metrics is not None:
+            metrics.observe("block_recv", clock() - start)
+        return bytes(block)
+
+
+class AsyncKWP1281Protocol:
+    """KWP1281 session on an asyncio event loop.
+
+    Mirrors KWP1281Protocol: the same commands, return values and logging,
+    as coroutines. Every command takes timeout=None (seconds for the whole
+    exchange). Commands are serialized by an asyncio.Lock; the keep-alive
+    task only sends an ACK after KEEPALIVE_INTERVAL without any block.
+
+    Relies on loop.add_reader() (see AsyncKLineSerial): POSIX event loops
+    only, not the Windows Proactor loop.
+    """
+
+    def __init__(self, on_log=None, on_state_change=None, rts_inverted=True,
+                 local_echo=False, adaptive_timing=True, on_block=None):
+        self.on_log = on_log or (lambda msg: None)
+        self.on_state_change = on_state_change or (lambda state: None)
+        self.on_block = on_block
+        self._log_blocks = on_log is not None
+        self.block_ring = LogRing(BLOCK_RING_SIZE)
+
+        self.connected = False
+        self.model = ""
+        self.ecu_address = 0
+        self.ecu_name = ""
+        self.baudrate = 0
+        self.part_number = ""
+
+        self._kline = AsyncKLineSerial(rts_inverted=rts_inverted, local_echo=local_echo,
+                                       adaptive_timing=adaptive_timing)
+        self._counter = 0
+        self._lock = asyncio.Lock()
+        self._keepalive_task = None
+        self._last_activity = 0.0
+        self._stream_ok = True
+        self._out_of_step = False  # an exchange failed mid-block (see _resync)
+        self.metrics = None
+
+    # Fault decoding, hex logging and metrics are shared with the threaded client
+    _parse_faults = KWP1281Protocol._parse_faults
+    _log_hex = KWP1281Protocol._log_hex
+    enable_metrics = KWP1281Protocol.enable_metrics
+    disable_metrics = KWP1281Protocol.disable_metrics
+
+    # ── Connection ──
+
+    async def connect(self, port, model, ecu_name, ecu_address, baudrate,
+                      retries=MAX_INIT_RETRIES, baud_candidates=BAUD_CANDIDATES):
+        """Connect to ECU: 5-baud init, handshake, ident. Returns part number.
+
+        The baudrate is detected from the sync byte as in
+        KWP1281Protocol.connect().
+        """
+        self.model = model
+        self.ecu_address = ecu_address
+        self.ecu_name = ecu_name
+        self.baudrate = baudrate
+        self._counter = 0
+        self._stream_ok = True
+
+        last_error = None
+        for attempt in range(1, retries + 1):
+            try:
+                self.on_log(f"Connection attempt {attempt}/{retries}...")
+                self.on_state_change("connecting")
+
+                self._kline.open(port, baudrate=9600)
+
+                self.on_log(f"Sending 5-baud address 0x{ecu_address:02X}...")
+                await self._kline.asend_5baud_address(ecu_address)
+
+                self.on_log(f"Waiting for sync @ {self.baudrate} baud...")
+                kw1, kw2 = await self._kline.aperform_handshake(self.baudrate, baud_candidates)
+                if self._kline.baudrate != self.baudrate:
+                    self.on_log(f"Sync detected at {self._kline.baudrate} baud")
+                    self.baudrate = self._kline.baudrate
+                self.on_log(f"Keywords: 0x{kw1:02X} 0x{kw2:02X}")
+
+                self.part_number = await self._read_ident_blocks()
+                self.on_log(f"ECU ID: {self.part_number}")
+
+                self.connected = True
+                self._out_of_step = False
+                if self.metrics is not None:
+                    self.metrics.inc("connects")
+                self.on_state_change("connected")
+                self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+                return self.part_number
+
+            except (KLineError, ProtocolError, OSError) as e:
+                last_error = e
+                self.on_log(f"Attempt {attempt} failed: {e}")
+                self._kline.close()
+                if self.metrics is not None:
+                    self.metrics.inc("connect_retries")
+                if attempt < retries:
+                    await asyncio.sleep(INIT_RETRY_TIMEOUT)
+            except asyncio.CancelledError:
+                self._kline.close()
+                self.on_state_change("disconnected")
+                raise
+
+        self.on_state_change("disconnected")
+        raise ConnectionLostError(f"Failed after {retries} attempts: {last_error}")
+
+    async def disconnect(self):
+        """Send EndComm and close the connection."""
+        await self._stop_keepalive()
+
+        if self.connected:
+            try:
+                async with self._lock:
+                    self.on_log("Sending EndComm...")
+                    await asyncio.wait_for(self._send_block(CMD_END_COMM), 1.0)
+            except Exception as e:
+                self.on_log(f"EndComm error (ignored): {e}")
+
+        self.connected = False
+        self._kline.close()
+        self.on_state_change("disconnected")
+        self.on_log("Disconnected")
+
+    def _abort(self, reason):
+        """Drop a session left mid-exchange by a timeout or cancellation."""
+        self.on_log(f"Command {reason}, session closed")
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        self.connected = False
+        self._kline.close()
+        self.on_state_change("disconnected")
+
+    async def _command(self, exchange, timeout):
+        """Run exchange() under the lock, with an optional timeout.
+
+        On timeout or cancellation the ECU is out of step, so the session is
+        closed; asyncio.TimeoutError / CancelledError propagate. Any other
+        failed exchange is followed by a resync before the next command.
+        """
+        if not self.connected:
+            raise ConnectionLostError("Not connected")
+        async with self._lock:
+            metrics = self.metrics
+            t0 = time.perf_counter()
+            try:
+                if self._out_of_step:
+                    await self._resync()
+                return await asyncio.wait_for(exchange(), timeout)
+            except asyncio.TimeoutError:
+                self._abort(f"timed out after {timeout} s")
+                raise
+            except asyncio.CancelledError:
+                self._abort("cancelled")
+                raise
+            except Exception as e:
+                if isinstance(e, (KLineError, ProtocolError)):
+                    self._out_of_step = True
+                if metrics is not None:
+                    metrics.inc("command_errors")
+                raise
+            finally:
+                if metrics is not None:
+                    metrics.inc("commands")
+                    metrics.observe("command", time.perf_counter() - t0)
+
+    async def _resync(self):
+        """One ACK exchange after a failed exchange. Caller holds the lock.
+
+        Lets the tail of a half-sent ECU block pass first. If the ECU does
+        not answer, the session is closed and ConnectionLostError raised.
+        """
+        t0 = time.monotonic()
+        try:
+            await self._kline.asettle(self._kline.timing.byte_timeout, self.block_deadline())
+            await self._send_ack()
+            title, _ = await self._recv_block()
+            await self._finish_exchange(title)
+        except (KLineError, ProtocolError, OSError) as e:
+            self._abort(f"could not resync ({e})")
+            raise ConnectionLostError(f"Session lost: {e}") from e
+        self._out_of_step = False
+        self.on_log(f"Session resynchronized in {(time.monotonic() - t0) * 1000:.0f} ms")
+        if self.metrics is not None:
+            self.metrics.inc("resumes")
+
+    # ── Block send/receive ──
+
+    async def _send_block(self, title, data=b""):
+        block = bytes([len(data) + 4, self._counter, title]) + data + bytes([ETX])
+        self._log_hex("TX", block)
+        try:
+            await self._kline.asend_block_with_acks(block)
+        except KLineError:
+            self._out_of_step = True
+            raise
+        self._counter = (self._counter + 1) & 0xFF
+        self._last_activity = time.monotonic()
+
+    async def _recv_block(self):
+        try:
+            block = await self._kline.arecv_block_with_acks()
+        except KLineError:
+            self._out_of_step = True
+            raise
+        self._log_hex("RX", block)
+        if block[-1] != ETX:
+            self.on_log(f"Warning: expected ETX 0x03, got 0x{block[-1]:02X}")
+        self._counter = (block[1] + 1) & 0xFF
+        self._last_activity = time.monotonic()
+        return (block[2], block[3:-1])
+
+    async def _send_ack(self):
+        await self._send_block(CMD_ACK)
+
+    async def _expect_ack(self):
+        title, _ = await self._recv_block()
+        if title == RSP_NAK:
+            raise ProtocolError("ECU responded with NAK")
+        if title != RSP_ACK:
+            raise ProtocolError(f"Expected ACK (0x09), got 0x{title:02X}")
+        return True
+
+    async def _finish_exchange(self, title):
+        if title != RSP_ACK:
+            await self._send_ack()
+            await self._recv_block()
+
+    async def _read_ident_blocks(self):
+        parts = []
+        while True:
+            title, data = await self._recv_block()
+            if title == RSP_ASCII_ID:
+                parts.append(data.decode("ascii", errors="replace").strip())
+                await self._send_ack()
+            elif title == RSP_ACK:
+                break
+            else:
+                self.on_log(f"Unexpected block 0x{title:02X} during ident")
+                await self._send_ack()
+                break
+        return " ".join(parts) if parts else "Unknown"
+
+    # ── Commands ──
+
+    async def read_faults(self, timeout=None):
+        """Read fault codes. Returns list of FaultRecord."""
+        async def exchange():
+            await self._send_block(CMD_READ_FAULTS)
+            title, data = await self._recv_block()
+            if title != RSP_FAULT_CODES:
+                await self._send_ack()
+                raise ProtocolError(f"Expected FaultCodes (0xFC), got 0x{title:02X}")
+            faults = self._parse_faults(data)
+            await self._send_ack()
+            await self._recv_block()
+            return faults
+        return await self._command(exchange, timeout)
+
+    async def clear_faults(self, timeout=None):
+        """Clear fault memory. Returns True on success."""
+        async def exchange():
+            try:
+                await self._send_block(CMD_CLEAR_FAULTS)
+                return await self._expect_ack()
+            except ProtocolError as e:
+                self.on_log(f"Clear faults failed: {e}")
+                return False
+        return await self._command(exchange, timeout)
+
+    async def _read_value_locked(self, register):
+        try:
+            await self._send_block(CMD_VALUE_REQ, bytes([0x01, 0x00, register]))
+            title, data = await self._recv_block()
+            await self._finish_exchange(title)
+            if title == RSP_BINARY_DATA and len(data) >= 1:
+                return data[0]
+            return None
+        except (KLineError, ProtocolError) as e:
+            self.on_log(f"Read value error: {e}")
+            return None
+
+    async def read_value(self, register, timeout=None):
+        """Read one value register. Returns raw byte or None."""
+        return await self._command(lambda: self._read_value_locked(register), timeout)
+
+    async def read_values(self, registers, timeout=None):
+        """Read several value registers in one lock hold. Returns list of raw/None."""
+        async def exchange():
+            return [await self._read_value_locked(reg) for reg in registers]
+        return await self._command(exchange, timeout)
+
+    async def read_values_stream(self, registers, timeout=None):
+        """Read several registers, chaining Value Requests in place of ACKs.
+
+        See KWP1281Protocol.read_values_stream(). Returns list of raw/None.
+        """
+        async def exchange():
+            results = []
+            awaiting = False
+            for reg in registers:
+                if awaiting and not self._stream_ok:
+                    await self._finish_exchange(RSP_BINARY_DATA)
+                    awaiting = False
+                chained = awaiting
+                try:
+                    await self._send_block(CMD_VALUE_REQ, bytes([0x01, 0x00, reg]))
+                    title, data = await self._recv_block()
+                    if title == RSP_BINARY_DATA and len(data) >= 1:
+                        results.append(data[0])
+                        awaiting = True
+                        continue
+                    await self._finish_exchange(title)
+                    awaiting = False
+                    if chained:
+                        self._stream_ok = False
+                        self.on_log(f"Chained Value Request refused (0x{title:02X}), "
+                                    "falling back to ACK/ACK")
+                        results.append(await self._read_value_locked(reg))
+                    else:
+                        results.append(None)
+                except (KLineError, ProtocolError) as e:
+                    self.on_log(f"Read value error: {e}")
+                    if chained:
+                        self._stream_ok = False
+                    awaiting = False
+                    results.append(None)
+            if awaiting:
+                try:
+                    await self._finish_exchange(RSP_BINARY_DATA)
+                except (KLineError, ProtocolError) as e:
+                    self.on_log(f"Read value error: {e}")
+            return results
+        return await self._command(exchange, timeout)
+
+    async def read_live_values(self, timeout=None):
+        """Read all live parameters. Returns list of (name, value, unit, formatted, ratio)."""
+        params = get_live_params(self.model, self.ecu_address)
+        raws = await self.read_values_stream([p[1] for p in params], timeout=timeout)
+        results = []
+        for param, raw in zip(params, raws):
+            if raw is None:
+                continue
+            lut = get_param_lut(param)
+            results.append((param[0], lut.values[raw], param[5], lut.text[raw], lut.ratios[raw]))
+        return results
+
+    async def read_adc(self, channel, timeout=None):
+        """Read ADC channel. Returns 16-bit value or None."""
+        async def exchange():
+            try:
+                await self._send_block(CMD_ADC_READ, bytes([channel]))
+                title, data = await self._recv_block()
+                if title == RSP_ADC_RESP and len(data) >= 2:
+                    await self._send_ack()
+                    await self._recv_block()
+                    return (data[0] << 8) | data[1]
+                await self._send_ack()
+                return None
+            except (KLineError, ProtocolError) as e:
+                self.on_log(f"ADC read error: {e}")
+                return None
+        return await self._command(exchange, timeout)
+
+    async def actuator_test(self, num, timeout=None):
+        """Start actuator test num (1-16). Returns True on success."""
+        async def exchange():
+            try:
+                await self._send_block(CMD_ACTUATOR, bytes([num]))
+                title, _ = await self._recv_block()
+                if title in (RSP_ACK, 0xF5):
+                    await self._finish_exchange(title)
+                    return True
+                await self._send_ack()
+                return False
+            except (KLineError, ProtocolError) as e:
+                self.on_log(f"Actuator test error: {e}")
+                return False
+        return await self._command(exchange, timeout)
+
+    async def read_group(self, group, timeout=None):
+        """Read measurement group. Returns list of (formula_id, value_a, value_b)."""
+        async def exchange():
+            try:
+                await self._send_block(CMD_READ_GROUP, bytes([group]))
+                title, data = await self._recv_block()
+                if title == RSP_GROUP_DATA:
+                    values = [tuple(data[i:i + 3]) for i in range(0, len(data) - 2, 3)]
+                    await self._send_ack()
+                    await self._recv_block()
+                    return values
+                await self._send_ack()
+                return []
+            except (KLineError, ProtocolError) as e:
+                self.on_log(f"ReadGroup error: {e}")
+                return []
+        return await self._command(exchange, timeout)
+
+    async def login(self, pin_hi, pin_lo, workshop=0x00, timeout=None):
+        """Send Login. Returns True on ACK."""
+        async def exchange():
+            try:
+                await self._send_block(CMD_LOGIN, bytes([pin_hi, pin_lo, workshop]))
+                return await self._expect_ack()
+            except ProtocolError as e:
+                self.on_log(f"Login failed: {e}")
+                return False
+        return await self._command(exchange, timeout)
+
+    async def read_adaptation(self, channel, timeout=None):
+        """Read adaptation channel. Returns (channel, value_16bit) or None."""
+        async def exchange():
+            try:
+                await self._send_block(CMD_READ_ADAPT, bytes([channel]))
+                title, data = await self._recv_block()
+                if title == RSP_ADAPT_RESP and len(data) >= 3:
+                    await self._send_ack()
+                    await self._recv_block()
+                    return (data[0], (data[1] << 8) | data[2])
+                await self._send_ack()
+                return None
+            except (KLineError, ProtocolError) as e:
+                self.on_log(f"ReadAdapt error: {e}")
+                return None
+        return await self._command(exchange, timeout)
+
+    async def write_adaptation(self, channel, value, timeout=None):
+        """Write a 16-bit adaptation value. Returns True on ACK."""
+        async def exchange():
+            try:
+                await self._send_block(CMD_WRITE_ADAPT,
+                                       bytes([channel, (value >> 8) & 0xFF, value & 0xFF]))
+                return await self._expect_ack()
+            except ProtocolError as e:
+                self.on_log(f"WriteAdapt failed: {e}")
+                return False
+        return await self._command(exchange, timeout)
+
+    # ── Keep-alive ──
+
+    async def _stop_keepalive(self):
+        task, self._keepalive_task = self._keepalive_task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def _keepalive_loop(self):
+        """Send an ACK exchange after KEEPALIVE_INTERVAL of bus silence."""
+        while self.connected:
+            due = self._last_activity + KEEPALIVE_INTERVAL
+            await asyncio.sleep(max(due - time.monotonic(), 0.1))
+            if self._lock.locked() or time.monotonic() < self._last_activity + KEEPALIVE_INTERVAL:
+                continue
+            try:
+                async with self._lock:
+                    if time.monotonic() < self._last_activity + KEEPALIVE_INTERVAL:
+                        continue
+                    t0 = time.monotonic()
+                    await self._send_ack()
+                    title, _ = await self._recv_block()
+                    if title != RSP_ACK:
+                        self.on_log(f"Keep-alive: unexpected response 0x{title:02X}")
+                    if self.metrics is not None:
+                        self.metrics.inc("keepalives")
+                        self.metrics.observe("keepalive", time.monotonic() - t0)
+            except (KLineError, ProtocolError, OSError) as e:
+                self.on_log(f"Keep-alive failed: {e}")
+                self.connected = False
+                self._kline.close()
+                self.on_state_change("disconnected")
+                break
+
+    # ── Helpers ──
+
+    def block_deadline(self, tx_len=4, rx_len=4, title=None):
+        """Worst-case seconds for one request/response exchange (adaptive)."""
+        return self._kline.timing.block_deadline(tx_len, rx_len, title)
+
+    def timing_stats(self):
+        """Return the adaptive timing snapshot for the current session."""
+        return self._kline.timing.snapshot()
+
+    def stop_live(self):
+        """No-op for API compatibility with DemoProtocol."""
+        pass
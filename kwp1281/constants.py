@@ -35,10 +35,38 @@ BIT_TIME_5BAUD       = 0.200   # 200ms per bit at 5 baud
 KEYWORD_ACK_DELAY    = 0.030   # 30ms before sending keyword2 ACK
 INTERBYTE_TIMEOUT    = 0.100   # 100ms inter-byte timeout
 BLOCK_TIMEOUT        = 1.0     # 1s block receive timeout
-KEEPALIVE_INTERVAL   = 4.0     # 4s between keep-alive ACKs
+ECU_IDLE_TIMEOUT     = 5.0     # ECU ends the session after 5s without a block
+KEEPALIVE_MARGIN     = 1.0     # keep-alive this long before the ECU would time out
+KEEPALIVE_INTERVAL   = ECU_IDLE_TIMEOUT - KEEPALIVE_MARGIN  # max bus idle time (4s)
 INIT_RETRY_TIMEOUT   = 1.0     # 1s before retrying init
+INIT_IDLE_TIME       = 0.300   # K-Line idle after EndComm before the next 5-baud init
+SYNC_TIMEOUT         = 1.0     # 1s for the sync byte after the 5-baud address
+BITBANG_SPIN         = 0.002   # busy-wait the last 2ms before each 5-baud edge
 ADAPTATION_TIMEOUT   = 60.0    # 60s for adaptation (v4)
 
+# ── Logging ──
+BLOCK_RING_SIZE      = 512     # raw blocks kept in KWP1281Protocol.block_ring
+
+# ── Baudrate detection from the sync byte ──
+BAUD_CANDIDATES      = (9600, 8800, 4800)  # KW1281 rates used by the ECUs below
+SYNC_MIN_MARGIN      = 0.15    # min distance (UART bits) of a sample from an edge
+
+# ── Command queue priorities (lower runs first) ──
+PRIORITY_INTERACTIVE = 0       # user commands: faults, groups, adaptation...
+PRIORITY_BULK        = 10      # live data sweeps (read_values*, LivePoller)
+
+# ── Adaptive timing (deadline = p99 * factor + margin, within [min, INTERBYTE]) ──
+ADAPTIVE_WINDOW      = 256     # latency samples kept per tracker
+ADAPTIVE_MIN_SAMPLES = 32      # samples before leaving the fixed timeouts
+ADAPTIVE_REFRESH     = 16      # samples between deadline recomputes
+ADAPTIVE_PERCENTILE  = 99
+ADAPTIVE_FACTOR      = 2.0
+ADAPTIVE_MARGIN      = 0.010   # 10ms added on top of the scaled percentile
+ADAPTIVE_MIN_TIMEOUT = 0.010   # never wait less than 10ms for a byte
+# Requests whose reply time is learned; any other block (faults, clear, login,
+# adaptation...) may take the ECU much longer and keeps INTERBYTE_TIMEOUT
+ADAPTIVE_TITLES      = (CMD_VALUE_REQ, CMD_ACK)
+
 # ── ECU Database ──
 # (name, address, baudrate)
 ECUS = {
@@ -122,4 +150,18 @@ DEMO_PART_NUMBERS = {
             0x3D: "965.355.755.00"},
 }
 
+# ── Demo/virtual ECU register values (raw bytes at idle) ──
+DEMO_BASE_VALUES = {
+    0x37: 140,   # intake temp ~80F
+    0x38: 180,   # head temp ~180F
+    0x39: 21,    # RPM ~840
+    0x3A: 21,    # RPM 964 ~840
+    0x42: 64,    # injector time
+    0x45: 92,    # AFM ~1.8V
+    0x5D: 80,    # timing advance
+    0x36: 204,   # battery ~13.9V
+    0x3D: 50,    # O2 ~150mV
+    0x47: 51,    # MAF ~1V
+}
+
 MAX_INIT_RETRIES = 3
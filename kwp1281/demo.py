@@ -6,9 +6,9 @@ import threading
 
 from . import fault_codes
 from .constants import (
-    ECUS, FAULT_SECTIONS, DEMO_PART_NUMBERS, CCU_ACTUATORS,
+    ECUS, FAULT_SECTIONS, DEMO_PART_NUMBERS, DEMO_BASE_VALUES, CCU_ACTUATORS,
 )
-from .formulas import get_live_params
+from .formulas import get_live_params, get_param_lut
 
 
 class DemoProtocol:
@@ -66,29 +66,22 @@ class DemoProtocol:
 
     def _generate_faults(self):
         """Generate a fixed set of demo faults from all available sections."""
-        faults = []
         sections = FAULT_SECTIONS.get(self.model, {}).get(self.ecu_address, [])
+        known = fault_codes.known_faults(self.model, self.ecu_address)
 
-        for section in sections:
-            all_codes = fault_codes.get_section_codes(section)
-            if not all_codes:
-                continue
-            code_items = list(all_codes.items())
-            # Take up to 8 codes per section to get a good scrollable list
-            num = min(8, len(code_items))
-            picked = random.sample(code_items, num)
-            for code_str, desc in picked:
-                count = random.randint(1, 12)
-                faults.append((code_str, desc, count))
-
-        # Sort by code number
-        faults.sort(key=lambda x: int(x[0]) if x[0].isdigit() else 0)
-        return faults
+        # Take up to 8 codes per section to get a good scrollable list
+        num = min(8 * len(sections), len(known))
+        picked = sorted(random.sample(known, num))
+        return [
+            fault_codes.fault_record(self.model, self.ecu_address, code,
+                                     random.choice((0x00, 0x80)) | random.randint(1, 12))
+            for code, _ in picked
+        ]
 
     def read_faults(self):
         """Return simulated fault codes (same list until cleared).
 
-        Returns list of (code_str, description, count) tuples.
+        Returns list of FaultRecord (unpacks as (code_str, description, count)).
         """
         if not self.connected:
             return []
@@ -125,23 +118,18 @@ class DemoProtocol:
             return None
 
         # Generate plausible values based on register
-        base_values = {
-            0x37: 140,   # intake temp ~80F
-            0x38: 180,   # head temp ~180F
-            0x39: 21,    # RPM ~840
-            0x3A: 21,    # RPM 964 ~840
-            0x42: 64,    # injector time
-            0x45: 92,    # AFM ~1.8V
-            0x5D: 80,    # timing advance
-            0x36: 204,   # battery ~13.9V
-            0x3D: 50,    # O2 ~150mV
-            0x47: 51,    # MAF ~1V
-        }
-        base = base_values.get(register, 128)
+        base = DEMO_BASE_VALUES.get(register, 128)
         jitter = max(1, int(base * 0.05))
         val = max(0, min(255, base + random.randint(-jitter, jitter)))
         return val
 
+    def read_values(self, registers):
+        """Simulate a burst of value reads. Returns list of raw bytes."""
+        with self._lock:
+            return [self.read_value(reg) for reg in registers]
+
+    read_values_stream = read_values
+
     def read_live_values(self):
         """Read all live data parameters for current ECU.
 
@@ -152,14 +140,12 @@ class DemoProtocol:
 
         params = get_live_params(self.model, self.ecu_address)
         results = []
-        for name, reg, formula, mn, mx, unit, fmt in params:
-            raw = self.read_value(reg)
+        for param in params:
+            raw = self.read_value(param[1])
             if raw is None:
                 continue
-            val = formula(raw)
-            ratio = min(max((val - mn) / (mx - mn), 0), 1.0) if mx > mn else 0
-            formatted = fmt.format(val)
-            results.append((name, val, unit, formatted, ratio))
+            lut = get_param_lut(param)
+            results.append((param[0], lut.values[raw], param[5], lut.text[raw], lut.ratios[raw]))
 
         return results
 
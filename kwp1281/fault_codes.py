@@ -1,74 +1,211 @@
-"""DTC database parsed from ScanTool Trouble Codes files."""
+"""DTC database parsed from ScanTool Trouble Codes files.
+
+The text files are read from T_OBD_extracted/ if it exists, otherwise
+straight out of T_OBD_Software.zip. Parsing happens once: the result is
+stored in a versioned marshal index next to this module, validated by the
+sources' mtime/size (and content hash when those change), and rebuilt only
+when a source actually changed.
+
+Usage:
+    python -m kwp1281.fault_codes --build
+"""
 
 import os
 import re
+import sys
+import hashlib
+import marshal
+import zipfile
 
 # Fault code database: section -> {code_str: description}
 _DB = {}
 
-# Data directory relative to this file
-_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                         "T_OBD_extracted")
+# Resolved per-ECU tables: (model, ecu_address) -> (256-tuple of descriptions,
+# tuple of (code, description) for the codes the sections define,
+# 256-tuple of the section each code was found in)
+_TABLES = {}
+
+_UNKNOWN = tuple(f"Unknown fault code {n}" for n in range(256))
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Data directory relative to this file, with the distribution zip as fallback
+_DATA_DIR = os.path.join(_BASE_DIR, "T_OBD_extracted")
+_ARCHIVE = os.path.join(_BASE_DIR, "T_OBD_Software.zip")
 
 _FILES = [
     "Trouble Codes 964.txt",
     "Trouble Codes 993.txt",
 ]
 
+# Bump when the parser or the index layout changes
+INDEX_VERSION = 1
+_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fault_codes.idx")
+
+_SECTION_RE = re.compile(r"^\[([A-Z0-9]+)\]$")
+# Handle both "11=Description" and "11 \x96 Description" formats
+_CODE_RE = re.compile(r"^(\d+)\s*[=\x96]\s*(.+)$")
 
-def _parse_trouble_codes_file(filepath):
-    """Parse a ScanTool Trouble Codes file into sections."""
+
+def _parse_trouble_codes(text):
+    """Parse the text of a ScanTool Trouble Codes file into sections."""
     codes = {}
     current_section = None
 
-    try:
-        with open(filepath, "r", encoding="utf-8", errors="replace") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith(";"):
-                    continue
-
-                # Section header: [S00], [M00], etc.
-                m = re.match(r"^\[([A-Z0-9]+)\]$", line)
-                if m:
-                    current_section = m.group(1)
-                    if current_section == "Trouble Code Descriptions":
-                        current_section = None
-                        continue
-                    if current_section not in codes:
-                        codes[current_section] = {}
-                    continue
-
-                if current_section is None:
-                    continue
-
-                # Code=Description or Code = Description (with possible unicode separator)
-                # Handle both "11=Description" and "11 \x96 Description" formats
-                m = re.match(r"^(\d+)\s*[=\x96]\s*(.+)$", line)
-                if m:
-                    code_str = m.group(1).strip()
-                    desc = m.group(2).strip()
-                    if desc:
-                        codes[current_section][code_str] = desc
-    except FileNotFoundError:
-        pass
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith(";"):
+            continue
+
+        # Section header: [S00], [M00], etc.
+        m = _SECTION_RE.match(line)
+        if m:
+            current_section = m.group(1)
+            codes.setdefault(current_section, {})
+            continue
+
+        if current_section is None:
+            continue
+
+        m = _CODE_RE.match(line)
+        if m:
+            desc = m.group(2).strip()
+            if desc:
+                codes[current_section][m.group(1)] = desc
 
     return codes
 
 
-def _load_database():
-    """Load all trouble code files into the database."""
-    global _DB
-    if _DB:
-        return
+# ── Sources ──
+
+def _sources():
+    """Locate the trouble code files.
 
+    Returns [(fname, path, member)]: member is None for a plain file, else
+    the file's name inside the zip at path.
+    """
+    found = []
+    names = None
     for fname in _FILES:
         path = os.path.join(_DATA_DIR, fname)
-        parsed = _parse_trouble_codes_file(path)
+        if os.path.isfile(path):
+            found.append((fname, path, None))
+            continue
+        if names is None:
+            try:
+                with zipfile.ZipFile(_ARCHIVE) as zf:
+                    names = set(zf.namelist())
+            except (OSError, zipfile.BadZipFile):
+                names = set()
+        if fname in names:
+            found.append((fname, _ARCHIVE, fname))
+    return found
+
+
+def _signature(sources):
+    """Cheap validity key: (fname, mtime_ns, size) of each source."""
+    sig = []
+    for fname, path, _ in sources:
+        st = os.stat(path)
+        sig.append((fname, st.st_mtime_ns, st.st_size))
+    return sig
+
+
+def _read_source(path, member):
+    if member is None:
+        with open(path, "rb") as f:
+            return f.read()
+    with zipfile.ZipFile(path) as zf:
+        return zf.read(member)
+
+
+def _read_sources(sources):
+    """Read all sources. Returns (raw bytes per source, sha1 hex per source)."""
+    raws = [_read_source(path, member) for _, path, member in sources]
+    return raws, [hashlib.sha1(raw).hexdigest() for raw in raws]
+
+
+def _parse_raws(raws):
+    """Parse and merge the raw source texts into one database."""
+    db = {}
+    for raw in raws:
+        parsed = _parse_trouble_codes(raw.decode("utf-8", errors="replace"))
         for section, entries in parsed.items():
-            if section not in _DB:
-                _DB[section] = {}
-            _DB[section].update(entries)
+            db.setdefault(section, {}).update(entries)
+    return db
+
+
+# ── Index ──
+
+def _read_index(path=_INDEX_PATH):
+    """Load the index dict, or None if absent, unreadable or outdated."""
+    try:
+        with open(path, "rb") as f:
+            index = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    return index
+
+
+def _write_index(index, path=_INDEX_PATH):
+    """Write the index atomically. A read-only install just skips caching."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            marshal.dump(index, f)
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
+
+
+def build_index(path=_INDEX_PATH):
+    """Parse the trouble code files and (re)write the index.
+
+    Returns the number of codes indexed.
+    """
+    sources = _sources()
+    raws, hashes = _read_sources(sources)
+    db = _parse_raws(raws)
+    _write_index({
+        "version": INDEX_VERSION,
+        "signature": _signature(sources),
+        "hashes": hashes,
+        "db": db,
+    }, path)
+    _DB.clear()
+    _DB.update(db)
+    _TABLES.clear()
+    return sum(len(codes) for codes in db.values())
+
+
+def _load_database():
+    """Load the database from the index, rebuilding it if a source changed."""
+    if _DB:
+        return
+
+    sources = _sources()
+    if not sources:
+        return
+    signature = _signature(sources)
+    index = _read_index()
+    if index is not None and index.get("signature") == signature:
+        _DB.update(index["db"])
+        return
+
+    raws, hashes = _read_sources(sources)
+    if index is None or index.get("hashes") != hashes:
+        index = {"version": INDEX_VERSION, "hashes": hashes, "db": _parse_raws(raws)}
+    # Same content with a new mtime (checkout, copy): only the key changes
+    index["signature"] = signature
+    _write_index(index)
+    _DB.update(index["db"])
 
 
 def lookup(section, code):
@@ -88,6 +225,132 @@ def lookup(section, code):
     return f"Unknown fault code {code_str}"
 
 
+def _resolve(model, ecu_address):
+    """Build (and cache) the resolved fault table for one ECU.
+
+    Sections are merged in FAULT_SECTIONS order, first section wins, so the
+    table gives the same answer as probing the sections one by one.
+    """
+    key = (model, ecu_address)
+    resolved = _TABLES.get(key)
+    if resolved is not None:
+        return resolved
+
+    from .constants import FAULT_SECTIONS
+    _load_database()
+
+    slots = [None] * 256
+    sections = [None] * 256
+    for section in FAULT_SECTIONS.get(model, {}).get(ecu_address, []):
+        for code_str, desc in _DB.get(section, {}).items():
+            n = int(code_str)
+            if n < 256 and str(n) == code_str and slots[n] is None:
+                slots[n] = desc
+                sections[n] = section
+
+    known = tuple((n, desc) for n, desc in enumerate(slots) if desc is not None)
+    table = tuple(desc if desc is not None else _UNKNOWN[n] for n, desc in enumerate(slots))
+    resolved = _TABLES[key] = (table, known, tuple(sections))
+    return resolved
+
+
+def fault_table(model, ecu_address):
+    """Return the 256-slot description tuple for an ECU, indexed by code byte.
+
+    Codes without a description hold "Unknown fault code N".
+    """
+    return _resolve(model, ecu_address)[0]
+
+
+def known_faults(model, ecu_address):
+    """Return ((code, description), ...) for every code the ECU's sections define."""
+    return _resolve(model, ecu_address)[1]
+
+
+def fault_sections(model, ecu_address):
+    """Return the 256-slot tuple of the section defining each code (or None)."""
+    return _resolve(model, ecu_address)[2]
+
+
+# ── Fault records ──
+
+class FaultRecord:
+    """One stored fault: code byte, raw status byte and where it is defined.
+
+    Status byte: bits 0-5 occurrence count, bits 6-7 fault type (bit 7 set =
+    permanent, bit 6 clear = intermittent). The description is looked up in
+    the ECU's resolved table only when accessed.
+
+    Iterating or indexing gives the legacy (code_str, description, count)
+    view, so `code, desc, count = record` keeps working; a record equals and
+    hashes like that tuple.
+    """
+
+    __slots__ = ("code", "status", "section", "_table")
+
+    def __init__(self, code, status, section=None, table=_UNKNOWN):
+        self.code = code
+        self.status = status
+        self.section = section
+        self._table = table
+
+    @property
+    def description(self):
+        return self._table[self.code]
+
+    @property
+    def count(self):
+        return self.status & 0x3F
+
+    @property
+    def type(self):
+        """Fault type, status bits 6-7 (0-3)."""
+        return self.status >> 6
+
+    @property
+    def permanent(self):
+        return bool(self.status & 0x80)
+
+    @property
+    def intermittent(self):
+        return not self.status & 0x40
+
+    def as_tuple(self):
+        """Return the legacy (code_str, description, count) tuple."""
+        return (str(self.code), self._table[self.code], self.status & 0x3F)
+
+    def __iter__(self):
+        return iter(self.as_tuple())
+
+    def __getitem__(self, index):
+        return self.as_tuple()[index]
+
+    def __len__(self):
+        return 3
+
+    def __eq__(self, other):
+        if isinstance(other, FaultRecord):
+            return (self.code, self.status, self.section) == (other.code, other.status, other.section)
+        if isinstance(other, tuple):
+            return self.as_tuple() == other
+        return NotImplemented
+
+    def __hash__(self):
+        # Must match the legacy tuple a record compares equal to (sets and
+        # dicts keyed by those tuples); equal records share that tuple too
+        return hash(self.as_tuple())
+
+    def __repr__(self):
+        return (f"FaultRecord(code={self.code}, status=0x{self.status:02X}, "
+                f"section={self.section!r})")
+
+
+def fault_record(model, ecu_address, code, status):
+    """Build a FaultRecord resolved against an ECU's fault table."""
+    table, _, sections = _resolve(model, ecu_address)
+    return FaultRecord(code, status, sections[code], table)
+
+
 def lookup_for_ecu(model, ecu_address, code):
     """Look up fault code trying all sections for a given ECU.
 
@@ -99,16 +362,10 @@ def lookup_for_ecu(model, ecu_address, code):
     Returns:
         Description string
     """
-    from .constants import FAULT_SECTIONS
-    _load_database()
-
-    sections = FAULT_SECTIONS.get(model, {}).get(ecu_address, [])
     code_str = str(int(code)) if isinstance(code, int) else str(code).strip()
-
-    for section in sections:
-        if section in _DB and code_str in _DB[section]:
-            return _DB[section][code_str]
-
+    n = int(code_str) if code_str.isdigit() else -1
+    if 0 <= n < 256 and str(n) == code_str:
+        return fault_table(model, ecu_address)[n]
     return f"Unknown fault code {code_str}"
 
 
@@ -122,3 +379,23 @@ def get_section_codes(section):
     """Return dict of {code_str: description} for a section."""
     _load_database()
     return dict(_DB.get(section, {}))
+
+
+def main(argv=None):
+    """Build the fault code index, or report what it contains."""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv not in ([], ["--build"]):
+        print("usage: python -m kwp1281.fault_codes [--build]")
+        return 2
+    if argv:
+        count = build_index()
+        print(f"{_INDEX_PATH}: {count} codes")
+        return 0
+    _load_database()
+    for section in sorted(_DB):
+        print(f"{section:6s} {len(_DB[section]):4d} codes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,15 @@
-"""Value conversion formulas for Motronic 964/993 registers, ADC channels, CCU."""
+"""Value conversion formulas for Motronic 964/993 registers, ADC channels, CCU.
+
+Every formula takes a single byte, so each is also compiled on first use into
+a FormulaLUT: 256 precomputed values, formatted strings and gauge ratios.
+Converting a sample is then an index, not a function call plus format().
+The *_array/convert_frame helpers convert whole NumPy columns at once.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # array conversions only
+    np = None
 
 
 def _temp_f(n):
@@ -11,6 +22,11 @@ def _temp_c(n):
     return (_temp_f(n) - 32) * 5.0 / 9.0
 
 
+def _identity(n):
+    """Raw value, for channels without a known formula."""
+    return n
+
+
 # ── Motronic 964 (M2.1, 8800 baud) ──
 # Register -> (name, formula_fn, unit, format_str)
 MOTRONIC_964 = {
@@ -106,27 +122,128 @@ LIVE_PARAMS_GENERIC = [
 ]
 
 
+# Target poll rate (Hz) per live param name, used by poller.LivePoller
+LIVE_RATES = {
+    "RPM":           10.0,
+    "Timing":        10.0,
+    "Injector Time":  5.0,
+    "AFM Voltage":    5.0,
+    "MAF Voltage":    5.0,
+    "O2 Sensor":      5.0,
+    "Battery":        1.0,
+    "Intake Temp":    0.5,
+    "Head Temp":      0.5,
+}
+LIVE_RATE_DEFAULT = 2.0
+
+# (model, ecu_address) -> register table, for compiled lookups
+REGISTER_TABLES = {
+    ("964", 0x10): MOTRONIC_964,
+    ("993", 0x10): MOTRONIC_993,
+    ("993", 0x51): CCU_993,
+    ("993", 0x1F): ABS_993,
+}
+
+ADC_TABLES = {
+    "964": ADC_964,
+    "993": ADC_993,
+}
+
+
+class FormulaLUT:
+    """Precomputed outputs of a single-byte formula for raw values 0-255.
+
+    values[n], text[n] (fmt applied) and ratios[n] (clamped position between
+    mn and mx, 0 if mx <= mn) are plain tuples; array() returns the values as
+    a NumPy float64 array for converting whole columns with take().
+    """
+
+    __slots__ = ("values", "text", "ratios", "_array")
+
+    def __init__(self, formula, fmt, mn=0, mx=0):
+        self.values = tuple(formula(n) for n in range(256))
+        self.text = tuple(fmt.format(v) for v in self.values)
+        if mx > mn:
+            self.ratios = tuple(min(max((v - mn) / (mx - mn), 0), 1.0) for v in self.values)
+        else:
+            self.ratios = (0,) * 256
+        self._array = None
+
+    def array(self):
+        """Return values as a read-only NumPy float64 array (built once)."""
+        if self._array is None:
+            _require_numpy()
+            arr = np.array(self.values, dtype=np.float64)
+            arr.setflags(write=False)
+            self._array = arr
+        return self._array
+
+
+_LUTS = {}
+_MOTRONIC_LUTS = {}  # (model, register) -> (name, lut, unit)
+_ADC_LUTS = {}       # (model, channel) -> (name, lut, unit)
+
+
+def compile_formula(formula, fmt, mn=0, mx=0):
+    """Return the (cached) FormulaLUT for a formula/format/range."""
+    key = (formula, fmt, mn, mx)
+    lut = _LUTS.get(key)
+    if lut is None:
+        lut = _LUTS[key] = FormulaLUT(formula, fmt, mn, mx)
+    return lut
+
+
+def get_lut(model, ecu_address, register):
+    """Return the FormulaLUT for a register of a model/ECU, or None."""
+    table = REGISTER_TABLES.get((model, ecu_address))
+    if table is None or register not in table:
+        return None
+    _, formula, _, fmt = table[register]
+    return compile_formula(formula, fmt)
+
+
+def get_adc_lut(model, channel):
+    """Return the FormulaLUT for an ADC channel (raw 0-255), or None."""
+    table = ADC_TABLES.get(model, ADC_993)
+    if channel not in table:
+        return None
+    _, formula, _, fmt = table[channel]
+    return compile_formula(formula, fmt)
+
+
+def get_param_lut(param):
+    """Return the FormulaLUT for a live param tuple, including gauge ratios."""
+    name, reg, formula, mn, mx, unit, fmt = param
+    return compile_formula(formula, fmt, mn, mx)
+
+
 def get_live_params(model, ecu_address):
     """Get live data parameter definitions for a model/ECU combo."""
     return LIVE_PARAMS.get((model, ecu_address), LIVE_PARAMS_GENERIC)
 
 
+def get_live_rate(name):
+    """Get the default poll rate (Hz) for a live param name."""
+    return LIVE_RATES.get(name, LIVE_RATE_DEFAULT)
+
+
 def convert_value(register, raw_byte, model="964"):
     """Convert a raw register byte to a human-readable value.
 
     Returns (name, value, unit, formatted_str) or None if register unknown.
     """
-    if model == "964":
-        reg_map = MOTRONIC_964
-    elif model == "993":
-        reg_map = MOTRONIC_993
-    else:
-        return None
+    entry = _MOTRONIC_LUTS.get((model, register))
+    if entry is None:
+        reg_map = REGISTER_TABLES.get((model, 0x10))
+        if reg_map is None or register not in reg_map:
+            return None
+        name, formula, unit, fmt = reg_map[register]
+        entry = _MOTRONIC_LUTS[(model, register)] = (name, compile_formula(formula, fmt), unit)
 
-    if register not in reg_map:
-        return None
-
-    name, formula, unit, fmt = reg_map[register]
+    name, lut, unit = entry
+    if 0 <= raw_byte <= 0xFF:
+        return (name, lut.values[raw_byte], unit, lut.text[raw_byte])
+    _, formula, _, fmt = REGISTER_TABLES[(model, 0x10)][register]
     value = formula(raw_byte)
     return (name, value, unit, fmt.format(value))
 
@@ -137,9 +254,111 @@ def convert_adc(channel, raw_value, model="964"):
     Returns (name, value, unit, formatted_str) or None.
     """
     adc_map = ADC_964 if model == "964" else ADC_993
-    if channel not in adc_map:
-        return None
+    entry = _ADC_LUTS.get((model, channel))
+    if entry is None:
+        if channel not in adc_map:
+            return None
+        name, formula, unit, fmt = adc_map[channel]
+        entry = _ADC_LUTS[(model, channel)] = (name, compile_formula(formula, fmt), unit)
 
-    name, formula, unit, fmt = adc_map[channel]
+    name, lut, unit = entry
+    if 0 <= raw_value <= 0xFF:
+        return (name, lut.values[raw_value], unit, lut.text[raw_value])
+    _, formula, _, fmt = adc_map[channel]
     value = formula(raw_value)
     return (name, value, unit, fmt.format(value))
+
+
+# ── Vectorized conversion (NumPy) ──
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for array conversions")
+
+
+def _convert_column(lut, formula, raw):
+    """LUT gather for byte-range columns, float formula otherwise."""
+    raw = np.asarray(raw)
+    if raw.dtype == np.uint8:
+        return lut.array().take(raw)
+    if raw.size == 0 or (raw.min() >= 0 and raw.max() <= 0xFF):
+        return lut.array().take(raw.astype(np.intp))
+    return np.asarray(formula(raw.astype(np.float64)), dtype=np.float64)
+
+
+def convert_array(model, ecu_address, register, raw):
+    """Convert a column of raw register values to engineering units.
+
+    Args:
+        raw: array-like of raw bytes (any integer dtype)
+
+    Returns float64 ndarray, or None if the register is unknown.
+    """
+    _require_numpy()
+    table = REGISTER_TABLES.get((model, ecu_address))
+    if table is None or register not in table:
+        return None
+    _, formula, _, fmt = table[register]
+    return _convert_column(compile_formula(formula, fmt), formula, raw)
+
+
+def convert_adc_array(model, channel, raw):
+    """Convert a column of ADC values (8- or 16-bit) like convert_adc().
+
+    Returns float64 ndarray, or None if the channel is unknown.
+    """
+    _require_numpy()
+    adc_map = ADC_964 if model == "964" else ADC_993
+    if channel not in adc_map:
+        return None
+    _, formula, _, fmt = adc_map[channel]
+    return _convert_column(compile_formula(formula, fmt), formula, raw)
+
+
+def word_array(hi, lo):
+    """Combine big-endian byte columns into 16-bit values.
+
+    Same assembly as read_adc()/read_adaptation(): (hi << 8) | lo. Adaptation
+    values have no published scaling and stay in these raw counts.
+    """
+    _require_numpy()
+    return (np.asarray(hi).astype(np.uint16) << 8) | np.asarray(lo).astype(np.uint16)
+
+
+def convert_frame(model, records):
+    """Convert a whole recorded session in one vectorized gather.
+
+    Args:
+        records: structured array with "t", "ecu", "register" and "raw"
+                 fields, e.g. recorder.Recording(path).records
+
+    Returns {(ecu, register): (name, unit, t, values)} with per-channel
+    arrays in recording order. Channels without a formula are passed
+    through as raw values with unit "raw".
+    """
+    _require_numpy()
+    keys = (records["ecu"].astype(np.uint16) << 8) | records["register"]
+    channels, inverse = np.unique(keys, return_inverse=True)
+
+    # One row of 256 outputs per channel, then a single 2-D gather
+    meta = []
+    table = np.empty((len(channels), 256), dtype=np.float64)
+    for row, key in enumerate(channels):
+        ecu, register = int(key) >> 8, int(key) & 0xFF
+        reg_map = REGISTER_TABLES.get((model, ecu), {})
+        if register in reg_map:
+            name, formula, unit, fmt = reg_map[register]
+        else:
+            name, formula, unit, fmt = (f"0x{ecu:02X}/0x{register:02X}", _identity, "raw", "{}")
+        table[row] = compile_formula(formula, fmt).array()
+        meta.append(((ecu, register), name, unit))
+    values = table[inverse, records["raw"]]
+
+    # Split by channel without a mask per channel
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(channels)))[:-1]
+    t = records["t"]
+    frame = {}
+    for (key, name, unit), idx in zip(meta, np.split(order, bounds)):
+        frame[key] = (name, unit, t[idx], values[idx])
+    return frame
@@ -0,0 +1,94 @@
+"""Bounded log ring with lazily rendered block hex dumps.
+
+Protocol blocks are logged as HexLine objects holding the raw block bytes;
+the "TX: [10 00 ...]" text is only built when a line is displayed or
+exported (str()), and then cached. LogRing keeps the last N entries of
+such lines and plain messages with their timestamps, so neither the
+protocol trace nor a UI log view grows without bound.
+
+Usage:
+    ring = LogRing(500)
+    proto = KWP1281Protocol(on_log=ring.append, on_block=ring.append)
+    ...
+    text = ring.render()                      # "[12:00:01] TX: [...]" lines
+    entries, seq = ring.since(seq)            # incremental consumers
+"""
+
+import time
+import threading
+from collections import deque
+
+
+class HexLine:
+    """One logged block: direction ("TX"/"RX") and raw bytes, rendered on str()."""
+
+    __slots__ = ("direction", "data", "_text")
+
+    def __init__(self, direction, data):
+        self.direction = direction
+        self.data = data
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            self._text = f"  {self.direction}: [{self.data.hex(' ').upper()}]"
+        return self._text
+
+    def __repr__(self):
+        return f"HexLine({self.direction!r}, {self.data!r})"
+
+
+class LogRing:
+    """Thread-safe ring of the last `capacity` log entries.
+
+    Entries are (seq, t, msg): seq counts every append since creation, t is
+    time.time(), msg a str or HexLine (anything str() can render).
+    """
+
+    def __init__(self, capacity=1000):
+        self._entries = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self.seq = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, msg, t=None):
+        with self._lock:
+            self._entries.append((self.seq, time.time() if t is None else t, msg))
+            self.seq += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def since(self, seq):
+        """Entries appended at or after `seq` still in the ring, and the next seq."""
+        with self._lock:
+            first = self.seq - len(self._entries)
+            entries = list(self._entries)[max(seq - first, 0):]
+            return entries, self.seq
+
+    def entries(self, last=None):
+        """The newest `last` entries (all if None), oldest first."""
+        with self._lock:
+            entries = list(self._entries)
+        return entries if last is None else entries[-last:]
+
+    @staticmethod
+    def format(entry):
+        _, t, msg = entry
+        return f"[{time.strftime('%H:%M:%S', time.localtime(t))}] {msg}"
+
+    def lines(self, last=None):
+        """Render the newest `last` entries as "[HH:MM:SS] message" strings."""
+        return [self.format(e) for e in self.entries(last)]
+
+    def render(self, last=None):
+        return "\n".join(self.lines(last))
+
+    def export(self, path):
+        """Write every entry in the ring to a text file."""
+        with open(path, "w", encoding="utf-8") as f:
+            for line in self.lines():
+                f.write(line + "\n")
@@ -0,0 +1,157 @@
+"""Session metrics - latency histograms and event counters for K-Line I/O.
+
+Metrics are off by default: KLineSerial and KWP1281Protocol keep a
+`metrics` attribute that is None, and every hook is a single `is not None`
+check. KWP1281Protocol.enable_metrics() attaches one Metrics object to both.
+
+Recorded (histograms in seconds):
+  ack_rtt     byte written -> complement / next ECU byte
+  response    end of our block -> first byte of the ECU's block
+  block_send  one block sent with all its ACKs
+  block_recv  one block received, first byte to ETX
+  command     one queued command exchange (lock to release)
+  keepalive   one keep-alive ACK/ACK exchange
+Counters: timeouts, bad_acks, commands, command_errors, keepalives,
+connects, connect_retries, resumes, resume_failures.
+
+Usage:
+    metrics = proto.enable_metrics()
+    ...
+    metrics.snapshot()          # dict
+    print(metrics.prometheus(labels={"port": proto.port}))
+"""
+
+import time
+import threading
+from bisect import bisect_left
+
+# Upper bucket bounds (seconds): K-Line byte times are ~1 ms, blocks tens of ms
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0015, 0.002, 0.003, 0.005, 0.0075,
+                   0.010, 0.015, 0.020, 0.030, 0.050, 0.100, 0.200, 0.500,
+                   1.0, 2.0, 5.0)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (seconds)."""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """Upper bound of the bucket holding the p-th percentile, or None."""
+        if not self.count:
+            return None
+        rank = p / 100.0 * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self):
+        """[(upper bound, count <= bound), ...] ending with (inf, count)."""
+        out = []
+        seen = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            seen += n
+            out.append((bound, seen))
+        return out
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+            "max": self.max if self.count else None,
+        }
+
+
+class Metrics:
+    """Counters and histograms of one session (or a whole sweep).
+
+    Thread-safe: one Metrics may be shared by several sessions (each with
+    its own I/O thread); a snapshot taken while they run may be off by the
+    exchanges in progress.
+    """
+
+    HISTOGRAMS = ("ack_rtt", "response", "block_send", "block_recv",
+                  "command", "keepalive")
+    COUNTERS = ("timeouts", "bad_acks", "commands", "command_errors",
+                "keepalives", "connects", "connect_retries", "resumes",
+                "resume_failures")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zero every counter and histogram and restart the clock."""
+        with self._lock:
+            self.started = time.monotonic()
+            self.histograms = {name: Histogram(self._buckets) for name in self.HISTOGRAMS}
+            self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            self.histograms[name].observe(seconds)
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def snapshot(self):
+        """Return {"uptime", "commands_per_second", "counters", "histograms"}."""
+        with self._lock:
+            uptime = time.monotonic() - self.started
+            return {
+                "uptime": uptime,
+                "commands_per_second": self.counters["commands"] / uptime if uptime > 0 else 0.0,
+                "counters": dict(self.counters),
+                "histograms": {name: h.snapshot() for name, h in self.histograms.items()},
+            }
+
+    def prometheus(self, prefix="kwp1281", labels=None):
+        """Render all metrics in the Prometheus text exposition format."""
+        base = ",".join(f'{k}="{v}"' for k, v in sorted((labels or {}).items()))
+
+        def series(name, extra=""):
+            inner = ",".join(x for x in (base, extra) if x)
+            return f"{name}{{{inner}}}" if inner else name
+
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {name: (h.cumulative(), h.sum, h.count)
+                          for name, h in self.histograms.items()}
+
+        lines = []
+        for name, value in counters.items():
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{series(metric)} {value}")
+        for name, (buckets, total, count) in histograms.items():
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, n in buckets:
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket = series(metric + "_bucket", 'le="%s"' % le)
+                lines.append(f"{bucket} {n}")
+            lines.append(f"{series(metric + '_sum')} {total!r}")
+            lines.append(f"{series(metric + '_count')} {count}")
+        return "\n".join(lines) + "\n"
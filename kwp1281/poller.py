@@ -0,0 +1,154 @@
+"""Live data poller - per-parameter rate scheduling into a sample ring buffer."""
+
+import time
+import heapq
+import threading
+from collections import deque, namedtuple
+
+from .constants import KEEPALIVE_INTERVAL
+from .protocol import ConnectionLostError
+from .formulas import get_live_params, get_live_rate, get_param_lut
+
+# t: wall-clock time.time(), raw: register byte, value: converted value
+Sample = namedtuple("Sample", "t name register raw value")
+
+
+class SampleRing:
+    """Thread-safe bounded ring of Samples; the oldest are dropped when full."""
+
+    def __init__(self, capacity=4096):
+        self._buf = deque(maxlen=capacity)
+        self._latest = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buf)
+
+    def put_many(self, samples):
+        with self._lock:
+            self._buf.extend(samples)
+            for s in samples:
+                self._latest[s.name] = s
+
+    def drain(self):
+        """Remove and return all buffered samples, oldest first."""
+        with self._lock:
+            out = list(self._buf)
+            self._buf.clear()
+        return out
+
+    def latest(self):
+        """Return {name: Sample} with the most recent sample per parameter."""
+        with self._lock:
+            return dict(self._latest)
+
+
+class LivePoller:
+    """Polls live parameters, each at its own rate, on a background thread.
+
+    Parameters due within the same tick are read as one burst through
+    proto.read_values_stream(), i.e. one lock hold, chained requests and no
+    keep-alive in between. With a recorder.Recorder, every sample is also
+    appended to the recording file.
+    Every request keeps the ECU session alive, so rates are floored at
+    1/KEEPALIVE_INTERVAL and no separate keep-alive ACK is needed.
+    A ConnectionLostError is answered with proto.reconnect() (ACK probe,
+    else full init); polling stops only if that fails too.
+
+    Usage:
+        poller = LivePoller(proto, rates={"RPM": 10.0})
+        poller.start()
+        ...
+        for sample in poller.ring.drain(): ...
+        poller.stop()
+    """
+
+    def __init__(self, proto, params=None, rates=None, ring=None, on_error=None,
+                 recorder=None):
+        self._proto = proto
+        self.recorder = recorder
+        self.params = params or get_live_params(proto.model, proto.ecu_address)
+        self.luts = {p[0]: get_param_lut(p) for p in self.params}
+        rates = rates or {}
+        min_rate = 1.0 / KEEPALIVE_INTERVAL
+        self._periods = [
+            1.0 / max(rates.get(p[0], get_live_rate(p[0])), min_rate) for p in self.params]
+        self.ring = ring or SampleRing()
+        self.on_error = on_error or (lambda exc: None)
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start polling on a daemon thread."""
+        if self.running:
+            return
+        self._stop.clear()
+        self.error = None
+        self._thread = threading.Thread(target=self._run, daemon=True, name="kwp1281-poller")
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling and wait for the current burst to finish."""
+        self._stop.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _recover(self, exc):
+        """Reconnect the session after a lost connection. True if polling can go on."""
+        reconnect = getattr(self._proto, "reconnect", None)
+        if reconnect is None or not isinstance(exc, ConnectionLostError):
+            return False
+        try:
+            reconnect()
+        except ConnectionLostError:
+            return False
+        return True
+
+    def _run(self):
+        if not self.params:
+            return
+        now = time.monotonic()
+        heap = [(now, i) for i in range(len(self.params))]
+        heapq.heapify(heap)
+
+        while not self._stop.is_set() and self._proto.connected:
+            wait = heap[0][0] - time.monotonic()
+            if wait > 0 and self._stop.wait(wait):
+                break
+
+            # Collect everything that is due now into one burst
+            now = time.monotonic()
+            due = []
+            while heap and heap[0][0] <= now:
+                due.append(heapq.heappop(heap))
+
+            try:
+                raws = self._proto.read_values_stream([self.params[i][1] for _, i in due])
+            except Exception as e:
+                if self._stop.is_set() or not self._recover(e):
+                    self.error = e
+                    self.on_error(e)
+                    break
+                raws = [None] * len(due)
+
+            t = time.time()
+            samples = []
+            for (_, i), raw in zip(due, raws):
+                if raw is not None:
+                    name, reg = self.params[i][:2]
+                    samples.append(Sample(t, name, reg, raw, self.luts[name].values[raw]))
+            if samples:
+                self.ring.put_many(samples)
+                if self.recorder is not None:
+                    self.recorder.append_samples(self._proto.ecu_address, samples)
+
+            # Reschedule; never try to catch up on missed slots
+            now = time.monotonic()
+            for deadline, i in due:
+                heapq.heappush(heap, (max(deadline + self._periods[i], now), i))
@@ -1,8 +1,11 @@
 """KWP1281 protocol state machine - connection, commands, keep-alive."""
 
 import time
+import heapq
+import itertools
 import threading
 import logging
+from concurrent.futures import Future
 
 from .serial_port import KLineSerial, KLineError, KLineTimeoutError
 from .constants import (
@@ -11,11 +14,13 @@ from .constants import (
     CMD_BASIC_SET, CMD_READ_GROUP, CMD_LOGIN, CMD_READ_ADAPT, CMD_WRITE_ADAPT,
     RSP_ACK, RSP_NAK, RSP_ASCII_ID, RSP_FAULT_CODES, RSP_BINARY_DATA,
     RSP_GROUP_DATA, RSP_ADAPT_RESP, RSP_ADC_RESP,
-    ETX, KEEPALIVE_INTERVAL, MAX_INIT_RETRIES,
-    FAULT_SECTIONS,
+    ETX, KEEPALIVE_INTERVAL, MAX_INIT_RETRIES, INIT_IDLE_TIME, INIT_RETRY_TIMEOUT,
+    PRIORITY_INTERACTIVE, PRIORITY_BULK,
+    FAULT_SECTIONS, BAUD_CANDIDATES, BLOCK_RING_SIZE,
 )
 from . import fault_codes
-from .formulas import get_live_params
+from .logring import HexLine, LogRing
+from .formulas import get_live_params, get_param_lut
 
 log = logging.getLogger(__name__)
 
@@ -28,9 +33,34 @@ class ConnectionLostError(ProtocolError):
     """Connection to ECU was lost."""
 
 
+class _Command:
+    """Queued command, ordered by priority then submission order."""
+
+    __slots__ = ("priority", "seq", "fn", "future", "key")
+
+    def __init__(self, priority, seq, fn, key):
+        self.priority = priority
+        self.seq = seq
+        self.fn = fn
+        self.future = Future()
+        self.key = key
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
 class KWP1281Protocol:
     """KWP1281 protocol implementation for Porsche 964/993/965.
 
+    While connected, one I/O worker thread owns the port. Commands from any
+    thread are queued by priority (interactive before bulk live data) and
+    the caller blocks on the result; identical pending reads are coalesced
+    into one exchange. Keep-alive runs on the worker when the queue is idle.
+
+    on_log receives plain strings. Every TX/RX block is kept as a HexLine in
+    block_ring; it is also passed to on_block if given (hex text built only
+    when displayed), otherwise to on_log as its rendered string.
+
     Usage:
         proto = KWP1281Protocol(on_log=print)
         proto.connect("/dev/ttyUSB0", "964", "Motronic M2.1", 0x10, 8800)
@@ -38,93 +68,275 @@ class KWP1281Protocol:
         proto.disconnect()
     """
 
-    def __init__(self, on_log=None, on_state_change=None, rts_inverted=True):
+    def __init__(self, on_log=None, on_state_change=None, rts_inverted=True,
+                 local_echo=False, adaptive_timing=True, on_block=None):
         self.on_log = on_log or (lambda msg: None)
         self.on_state_change = on_state_change or (lambda state: None)
+        self.on_block = on_block
+        self._log_blocks = on_log is not None
+        self.block_ring = LogRing(BLOCK_RING_SIZE)  # last blocks, rendered on demand
 
         self.connected = False
         self.model = ""
         self.ecu_address = 0
         self.ecu_name = ""
         self.part_number = ""
+        self.port = ""
+        self.baudrate = 0
 
-        self._kline = KLineSerial(rts_inverted=rts_inverted)
+        self._kline = KLineSerial(rts_inverted=rts_inverted, local_echo=local_echo,
+                                  adaptive_timing=adaptive_timing)
         self._counter = 0
-        self._lock = threading.Lock()
-        self._keepalive_thread = None
-        self._keepalive_stop = threading.Event()
-        self._cmd_active = threading.Event()  # set when a command is running
+        self._lock = threading.RLock()    # held for every exchange on the port
+        self._reconnect_lock = threading.Lock()  # one recovery at a time
+        self._recovering = None           # thread running reconnect(), if any
+        self._cancel = threading.Event()  # set by disconnect(): stop connecting
+        self._busy = 0                    # nesting depth of running commands (under _lock)
+        self._queue = []                  # heap of pending _Commands
+        self._pending = {}                # coalescing key -> queued _Command
+        self._queue_cv = threading.Condition()
+        self._seq = itertools.count()
+        self._worker = None               # I/O worker thread while connected
+        self._worker_stop = False
+        self._keepalive_on = False
+        self._last_activity = 0.0  # monotonic end of the last block on the bus
+        self._stream_ok = True     # ECU accepts chained Value Requests
+        self._out_of_step = False  # an exchange failed mid-block (see _resync)
+        self._connected_at = 0.0
+        self._next_init_at = 0.0   # earliest 5-baud start after the last EndComm
+        self.keepalive_count = 0   # keep-alive exchanges this session
+        self.keepalive_time = 0.0  # bus seconds spent in them
+        self.metrics = None        # metrics.Metrics while enabled
 
     # ── Connection ──
 
-    def connect(self, port, model, ecu_name, ecu_address, baudrate):
+    def connect(self, port, model, ecu_name, ecu_address, baudrate,
+                retries=MAX_INIT_RETRIES, baud_candidates=BAUD_CANDIDATES):
         """Connect to ECU via K-Line.
 
         Performs 5-baud init, handshake, and reads ECU identification.
+        retries=1 fails fast, e.g. when probing for modules that may be absent.
+        baudrate is the expected rate; if the ECU's sync byte shows one of
+        baud_candidates instead, the session locks onto that rate (also for
+        retries) and self.baudrate is updated. baud_candidates=() disables
+        detection.
         Returns part number string on success.
         """
+        self._cancel.clear()
+        return self._connect(port, model, ecu_name, ecu_address, baudrate,
+                             retries, baud_candidates)
+
+    def _connect(self, port, model, ecu_name, ecu_address, baudrate,
+                 retries=MAX_INIT_RETRIES, baud_candidates=BAUD_CANDIDATES):
+        """connect() without clearing a pending disconnect() (used by reconnect()).
+
+        Each attempt holds _lock from the 5-baud init to the ident, so no
+        other exchange can reach the port mid-init; disconnect() cancels
+        the remaining attempts.
+        """
+        self.port = port
         self.model = model
         self.ecu_address = ecu_address
         self.ecu_name = ecu_name
+        self.baudrate = baudrate
         self._counter = 0
+        self._stream_ok = True
+        self._stop_worker()
 
         last_error = None
-        for attempt in range(1, MAX_INIT_RETRIES + 1):
+        for attempt in range(1, retries + 1):
+            if self._cancel.is_set():
+                break
             try:
-                self.on_log(f"Connection attempt {attempt}/{MAX_INIT_RETRIES}...")
-                self.on_state_change("connecting")
-
-                # Open serial port at a dummy baudrate
-                self._kline.open(port, baudrate=9600)
-
-                # 5-baud init
-                self.on_log(f"Sending 5-baud address 0x{ecu_address:02X}...")
-                self._kline.send_5baud_address(ecu_address)
-
-                # Handshake
-                self.on_log(f"Waiting for sync @ {baudrate} baud...")
-                kw1, kw2 = self._kline.perform_handshake(baudrate)
-                self.on_log(f"Keywords: 0x{kw1:02X} 0x{kw2:02X}")
-
-                # Read ECU ident block(s)
-                self.part_number = self._read_ident_blocks()
-                self.on_log(f"ECU ID: {self.part_number}")
-
-                self.connected = True
+                with self._lock:
+                    self._init_session(attempt, retries, baud_candidates)
+                    if self._cancel.is_set():
+                        self._kline.close()
+                        break
+                    self.connected = True
+                    self._out_of_step = False
+                    self._connected_at = time.monotonic()
+                    self.keepalive_count = 0
+                    self.keepalive_time = 0.0
+                    # Start the I/O worker and its idle keep-alive; under
+                    # _lock so disconnect() cannot miss them
+                    self._start_worker()
+                    self._start_keepalive()
+                if self.metrics is not None:
+                    self.metrics.inc("connects")
                 self.on_state_change("connected")
-
-                # Start keep-alive
-                self._start_keepalive()
-
                 return self.part_number
 
             except (KLineError, KLineTimeoutError, ProtocolError, OSError) as e:
                 last_error = e
                 self.on_log(f"Attempt {attempt} failed: {e}")
                 self._kline.close()
-                if attempt < MAX_INIT_RETRIES:
-                    time.sleep(1.0)
+                if self.metrics is not None:
+                    self.metrics.inc("connect_retries")
+                if attempt < retries:
+                    self._cancel.wait(INIT_RETRY_TIMEOUT)
 
         self.on_state_change("disconnected")
-        raise ConnectionLostError(f"Failed after {MAX_INIT_RETRIES} attempts: {last_error}")
-
-    def disconnect(self):
-        """Send EndComm and close connection."""
+        if self._cancel.is_set():
+            raise ConnectionLostError("Connection cancelled by disconnect()")
+        raise ConnectionLostError(f"Failed after {retries} attempts: {last_error}")
+
+    def _init_session(self, attempt, retries, baud_candidates):
+        """One 5-baud init, handshake and ident read. Caller holds _lock."""
+        self.on_log(f"Connection attempt {attempt}/{retries}...")
+        self.on_state_change("connecting")
+
+        # Open serial port at a dummy baudrate
+        self._kline.open(self.port, baudrate=9600)
+
+        # 5-baud init
+        self.on_log(f"Sending 5-baud address 0x{self.ecu_address:02X}...")
+        self._kline.send_5baud_address(self.ecu_address, start_at=self._next_init_at)
+        report = self._kline.init_report
+        if report:
+            self.on_log(f"5-baud frame {report['frame_s']:.3f} s, "
+                        f"edge jitter max {report['max_jitter_ms']:.2f} ms")
+
+        # Handshake
+        self.on_log(f"Waiting for sync @ {self.baudrate} baud...")
+        kw1, kw2 = self._kline.perform_handshake(self.baudrate, baud_candidates)
+        if self._kline.baudrate != self.baudrate:
+            self.on_log(f"Sync detected at {self._kline.baudrate} baud")
+            self.baudrate = self._kline.baudrate
+        self.on_log(f"Keywords: 0x{kw1:02X} 0x{kw2:02X}")
+
+        # Read ECU ident block(s)
+        self.part_number = self._read_ident_blocks()
+        self.on_log(f"ECU ID: {self.part_number}")
+
+    def disconnect(self, keep_port=False):
+        """Send EndComm and close connection.
+
+        keep_port=True leaves the serial port open for the next connect() on
+        the same port (multi-ECU sweeps); that init is scheduled for
+        INIT_IDLE_TIME after the EndComm instead of after a close/reopen.
+        Also cancels a reconnect() running in the background: its current
+        init attempt finishes (under _lock), no further attempt starts.
+        """
+        self._cancel.set()
         self._stop_keepalive()
+        self._stop_worker()
 
-        if self.connected:
-            try:
-                with self._lock:
+        with self._lock:
+            if self.connected:
+                try:
                     self.on_log("Sending EndComm...")
                     self._send_block(CMD_END_COMM)
-            except Exception as e:
-                self.on_log(f"EndComm error (ignored): {e}")
+                except Exception as e:
+                    self.on_log(f"EndComm error (ignored): {e}")
+                self._next_init_at = time.monotonic() + INIT_IDLE_TIME
 
-        self.connected = False
-        self._kline.close()
+            self.connected = False
+            if not keep_port:
+                self._kline.close()
+        # A reconnect() may have started a worker before we took _lock
+        self._stop_keepalive()
+        self._stop_worker()
         self.on_state_change("disconnected")
         self.on_log("Disconnected")
 
+    def resume(self):
+        """Try to pick up the current ECU session without a 5-baud init.
+
+        Sends one ACK block at the session baudrate and block counter
+        (reopening the port if an error closed it). If the ECU is still in
+        session it answers, and its reply resynchronizes the block counter.
+        Returns True if the session was resumed.
+        """
+        if not self.port or not self.baudrate or self._cancel.is_set():
+            return False
+        self._stop_keepalive()
+        self._stop_worker(fail_queued=False)
+
+        t0 = time.monotonic()
+        try:
+            with self._lock:
+                self._probe_session()
+                if self._cancel.is_set():
+                    return False
+                self.connected = True
+                self._start_worker()
+                self._start_keepalive()
+        except (KLineError, ProtocolError, OSError) as e:
+            self.on_log(f"Session resume failed: {e}")
+            self._kline.close()
+            self.connected = False
+            self._fail_queued(ConnectionLostError(f"Session resume failed: {e}"))
+            if self.metrics is not None:
+                self.metrics.inc("resume_failures")
+            return False
+
+        self.on_log(f"Session resumed in {(time.monotonic() - t0) * 1000:.0f} ms")
+        if self.metrics is not None:
+            self.metrics.inc("resumes")
+        self.on_state_change("connected")
+        return True
+
+    def _probe_session(self):
+        """One ACK exchange that resynchronizes the ECU session. Caller holds _lock.
+
+        Reopens the port if an error closed it and first lets the tail of a
+        half-sent ECU block pass (at most one block_deadline()). Raises
+        KLineError/ProtocolError/OSError if the ECU does not answer.
+        """
+        if not self._kline.is_open:
+            self._kline.open(self.port, baudrate=9600)
+            self._kline.set_baudrate(self.baudrate)
+        self._kline.settle(self._kline.timing.byte_timeout, self.block_deadline())
+        self._send_ack()
+        title, _ = self._recv_block()
+        self._finish_exchange(title)
+        self._out_of_step = False
+
+    def _resync(self):
+        """Probe after a failed exchange before the next command. Caller holds _lock.
+
+        Raises ConnectionLostError if the ECU is gone; callers (LivePoller,
+        Session, the app) then reconnect().
+        """
+        t0 = time.monotonic()
+        try:
+            self._probe_session()
+        except (KLineError, ProtocolError, OSError) as e:
+            self.connected = False
+            self.on_state_change("disconnected")
+            raise ConnectionLostError(f"Session lost: {e}") from e
+        self.on_log(f"Session resynchronized in {(time.monotonic() - t0) * 1000:.0f} ms")
+        if self.metrics is not None:
+            self.metrics.inc("resumes")
+
+    def reconnect(self):
+        """Recover the session after an error: resume(), else a full connect().
+
+        Also called by the I/O worker when a keep-alive fails, and by
+        LivePoller and sessions.Session on ConnectionLostError. Commands
+        submitted meanwhile wait for the outcome (see _submit); disconnect()
+        cancels the recovery.
+        Returns part number string; raises ConnectionLostError like connect().
+        """
+        with self._reconnect_lock:
+            if self.connected and not self._out_of_step:
+                return self.part_number  # another thread just recovered it
+            if self._cancel.is_set():
+                raise ConnectionLostError("Disconnected")
+            with self._queue_cv:
+                self._recovering = threading.current_thread()
+            try:
+                if self.resume():
+                    return self.part_number
+                self.on_log("Falling back to full init...")
+                return self._connect(self.port, self.model, self.ecu_name,
+                                     self.ecu_address, self.baudrate)
+            finally:
+                with self._queue_cv:
+                    self._recovering = None
+                    self._queue_cv.notify_all()
+
     # ── Block send/receive ──
 
     def _send_block(self, title, data=b""):
@@ -138,50 +350,37 @@ class KWP1281Protocol:
 
         self._log_hex("TX", block)
 
-        # Send each byte, wait for ACK on all except last (ETX)
-        for i, b in enumerate(block):
-            if i < len(block) - 1:
-                self._kline.send_byte_with_ack(b)
-            else:
-                self._kline.write_byte(b)  # ETX: no ACK expected
+        # Each byte but the ETX is ACKed by the ECU with its complement
+        try:
+            self._kline.send_block_with_acks(block)
+        except KLineError:
+            self._out_of_step = True
+            raise
 
         self._counter = (self._counter + 1) & 0xFF
+        self._last_activity = time.monotonic()
 
     def _recv_block(self):
         """Receive a KWP1281 block with inter-byte ACK protocol.
 
         Returns (title, data_bytes).
         """
-        # Receive length byte, send ACK
-        length = self._kline.recv_byte_with_ack()
-
-        # Receive counter, send ACK
-        counter = self._kline.recv_byte_with_ack()
-
-        # Receive title, send ACK
-        title = self._kline.recv_byte_with_ack()
-
-        # Receive data bytes (length - 3 = data + ETX, so data = length - 3 - 1)
-        # Actually: block = [Len, Cnt, Title, ...Data, ETX]
-        # Len counts from Len to ETX inclusive, so data_len = Len - 3
-        # But the -1 for ETX is separate
-        data_count = length - 3  # number of remaining bytes including ETX
-        data = bytearray()
-        for i in range(data_count):
-            if i < data_count - 1:
-                # Data byte: receive and ACK
-                data.append(self._kline.recv_byte_with_ack())
-            else:
-                # Last byte should be ETX: receive but don't ACK
-                etx = self._kline.read_byte(timeout=0.1)
-                if etx != ETX:
-                    self.on_log(f"Warning: expected ETX 0x03, got 0x{etx:02X}")
-
-        block = bytes([length, counter, title]) + bytes(data) + bytes([ETX])
+        # Every byte but the ETX is ACKed with its complement
+        try:
+            block = self._kline.recv_block_with_acks()
+        except KLineError:
+            self._out_of_step = True
+            raise
         self._log_hex("RX", block)
 
+        if block[-1] != ETX:
+            self.on_log(f"Warning: expected ETX 0x03, got 0x{block[-1]:02X}")
+
+        counter = block[1]
+        title = block[2]
         self._counter = (counter + 1) & 0xFF
-        return (title, bytes(data))
+        self._last_activity = time.monotonic()
+        return (title, block[3:-1])
 
     def _send_ack(self):
         """Send ACK block (keep-alive)."""
@@ -227,28 +426,26 @@ class KWP1281Protocol:
     def read_faults(self):
         """Read fault codes from ECU.
 
-        Returns list of (code_str, description, count) tuples.
+        Returns list of FaultRecord (unpacks as (code_str, description, count)).
         """
-        with self._lock:
-            self._pause_keepalive()
-            try:
-                self._send_block(CMD_READ_FAULTS)
-                title, data = self._recv_block()
+        def exchange():
+            self._send_block(CMD_READ_FAULTS)
+            title, data = self._recv_block()
 
-                if title != RSP_FAULT_CODES:
-                    self._send_ack()
-                    raise ProtocolError(f"Expected FaultCodes (0xFC), got 0x{title:02X}")
+            if title != RSP_FAULT_CODES:
+                self._send_ack()
+                raise ProtocolError(f"Expected FaultCodes (0xFC), got 0x{title:02X}")
 
-                faults = self._parse_faults(data)
+            faults = self._parse_faults(data)
 
-                # ACK the fault response
-                self._send_ack()
-                # Receive ECU's ACK
-                self._recv_block()
+            # ACK the fault response
+            self._send_ack()
+            # Receive ECU's ACK
+            self._recv_block()
 
-                return faults
-            finally:
-                self._resume_keepalive()
+            return faults
+
+        return self._submit(exchange)
 
     def _parse_faults(self, data):
         """Parse fault code response data.
@@ -259,27 +456,21 @@ class KWP1281Protocol:
         if len(data) == 1 and data[0] == 0x00:
             return []
 
+        table = fault_codes.fault_table(self.model, self.ecu_address)
+        sections = fault_codes.fault_sections(self.model, self.ecu_address)
+        record = fault_codes.FaultRecord
         faults = []
-        i = 0
-        while i + 1 < len(data):
+        for i in range(0, len(data) - 1, 2):
             code_byte = data[i]
-            status_byte = data[i + 1]
-            i += 2
-
             if code_byte == 0x00:
                 continue
-
-            count = status_byte & 0x3F
-            code_str = str(code_byte)
-            desc = fault_codes.lookup_for_ecu(self.model, self.ecu_address, code_byte)
-            faults.append((code_str, desc, count))
+            faults.append(record(code_byte, data[i + 1], sections[code_byte], table))
 
         return faults
 
     def clear_faults(self):
         """Clear fault memory. Returns True on success."""
-        with self._lock:
-            self._pause_keepalive()
+        def exchange():
             try:
                 self._send_block(CMD_CLEAR_FAULTS)
                 self._expect_ack()
@@ -287,8 +478,8 @@ class KWP1281Protocol:
             except ProtocolError as e:
                 self.on_log(f"Clear faults failed: {e}")
                 return False
-            finally:
-                self._resume_keepalive()
+
+        return self._submit(exchange)
 
     def read_value(self, register):
         """Read a single value from Motronic (OBDPlot Value Request 0x01).
@@ -298,28 +489,113 @@ class KWP1281Protocol:
 
         Returns raw byte value (int) or None on error.
         """
-        with self._lock:
-            self._pause_keepalive()
+        return self._submit(lambda: self._read_value_locked(register),
+                            key=(CMD_VALUE_REQ, register))
+
+    def read_values(self, registers):
+        """Read several value registers in one burst.
+
+        The whole burst is one bulk-priority command, i.e. one lock hold
+        instead of one per register.
+
+        Returns list of raw byte values (int or None on error), in order.
+        """
+        return self._submit(lambda: self._read_values_locked(registers), PRIORITY_BULK)
+
+    def _read_values_locked(self, registers):
+        """Value Request exchanges for a burst. Caller holds _lock."""
+        results = []
+        for reg in registers:
+            if self._out_of_step:
+                self._resync()  # ConnectionLostError ends the burst
+            results.append(self._read_value_locked(reg))
+        return results
+
+    def _read_value_locked(self, register):
+        """Value Request exchange for one register. Caller holds _lock."""
+        try:
+            # Value Request: [0x01, 0x01, 0x00, register]
+            data = bytes([0x01, 0x00, register])
+            self._send_block(CMD_VALUE_REQ, data)
+            title, resp_data = self._recv_block()
+
+            self._finish_exchange(title)
+            if title == RSP_BINARY_DATA and len(resp_data) >= 1:
+                return resp_data[0]
+            return None
+        except (KLineError, ProtocolError) as e:
+            self.on_log(f"Read value error: {e}")
+            return None
+
+    def read_values_stream(self, registers):
+        """Read several value registers, chaining requests in place of ACKs.
+
+        After a 0xFE response the ECU waits for our next block. Like OBDPlot,
+        the next Value Request is sent there instead of an ACK, which saves
+        the ACK/ACK exchange (two of four blocks) per register. If the ECU
+        rejects a chained request, chaining is disabled for the session and
+        reads fall back to the ACK/ACK sequence of read_value().
+
+        Returns list of raw byte values (int or None on error), in order.
+        """
+        return self._submit(lambda: self._read_values_stream_locked(registers),
+                            PRIORITY_BULK)
+
+    def _read_values_stream_locked(self, registers):
+        """Chained Value Request exchanges. Caller holds _lock."""
+        results = []
+        awaiting = False  # ECU sent 0xFE and waits for our next block
+
+        for reg in registers:
+            if awaiting and not self._stream_ok:
+                self._finish_exchange(RSP_BINARY_DATA)
+                awaiting = False
+            chained = awaiting
+
             try:
-                # Value Request: [0x01, 0x01, 0x00, register]
-                data = bytes([0x01, 0x00, register])
-                self._send_block(CMD_VALUE_REQ, data)
+                self._send_block(CMD_VALUE_REQ, bytes([0x01, 0x00, reg]))
                 title, resp_data = self._recv_block()
 
                 if title == RSP_BINARY_DATA and len(resp_data) >= 1:
-                    self._send_ack()
-                    self._recv_block()  # ECU ACK
-                    return resp_data[0]
-                elif title == RSP_ACK:
-                    return None
+                    results.append(resp_data[0])
+                    awaiting = True
+                    continue
+
+                self._finish_exchange(title)
+                awaiting = False
+                if chained:
+                    self._stream_ok = False
+                    self.on_log(f"Chained Value Request refused (0x{title:02X}), "
+                                "falling back to ACK/ACK")
+                    results.append(self._read_value_locked(reg))
                 else:
-                    self._send_ack()
-                    return None
+                    results.append(None)
             except (KLineError, ProtocolError) as e:
                 self.on_log(f"Read value error: {e}")
-                return None
-            finally:
-                self._resume_keepalive()
+                if chained:
+                    self._stream_ok = False
+                awaiting = False
+                results.append(None)
+            if self._out_of_step:
+                self._resync()  # ConnectionLostError ends the burst
+
+        if awaiting:
+            try:
+                self._finish_exchange(RSP_BINARY_DATA)
+            except (KLineError, ProtocolError) as e:
+                self.on_log(f"Read value error: {e}")
+
+        return results
+
+    def _finish_exchange(self, title):
+        """Close an exchange after an ECU block with the given title.
+
+        An ECU ACK leaves the turn with us; anything else is ACKed and the
+        ECU's ACK received.
+        """
+        if title != RSP_ACK:
+            self._send_ack()
+            self._recv_block()
 
     def read_live_values(self):
         """Read all live data parameters for current ECU.
@@ -327,15 +603,13 @@ class KWP1281Protocol:
         Returns list of (name, value, unit, formatted, ratio) tuples.
         """
         params = get_live_params(self.model, self.ecu_address)
+        raws = self.read_values_stream([p[1] for p in params])
         results = []
-        for name, reg, formula, mn, mx, unit, fmt in params:
-            raw = self.read_value(reg)
+        for param, raw in zip(params, raws):
             if raw is None:
                 continue
-            val = formula(raw)
-            ratio = min(max((val - mn) / (mx - mn), 0), 1.0) if mx > mn else 0
-            formatted = fmt.format(val)
-            results.append((name, val, unit, formatted, ratio))
+            lut = get_param_lut(param)
+            results.append((param[0], lut.values[raw], param[5], lut.text[raw], lut.ratios[raw]))
         return results
 
     def read_adc(self, channel):
@@ -343,8 +617,7 @@ class KWP1281Protocol:
 
         Returns 16-bit value or None.
         """
-        with self._lock:
-            self._pause_keepalive()
+        def exchange():
             try:
                 self._send_block(CMD_ADC_READ, bytes([channel]))
                 title, data = self._recv_block()
@@ -360,8 +633,8 @@ class KWP1281Protocol:
             except (KLineError, ProtocolError) as e:
                 self.on_log(f"ADC read error: {e}")
                 return None
-            finally:
-                self._resume_keepalive()
+
+        return self._submit(exchange, key=(CMD_ADC_READ, channel))
 
     def actuator_test(self, num):
         """Start actuator test.
@@ -371,8 +644,7 @@ class KWP1281Protocol:
 
         Returns True on success.
         """
-        with self._lock:
-            self._pause_keepalive()
+        def exchange():
             try:
                 self._send_block(CMD_ACTUATOR, bytes([num]))
                 title, data = self._recv_block()
@@ -389,16 +661,15 @@ class KWP1281Protocol:
             except (KLineError, ProtocolError) as e:
                 self.on_log(f"Actuator test error: {e}")
                 return False
-            finally:
-                self._resume_keepalive()
+
+        return self._submit(exchange)
 
     def read_group(self, group):
         """Read measurement group.
 
         Returns list of up to 4 (formula_id, value_a, value_b) tuples.
         """
-        with self._lock:
-            self._pause_keepalive()
+        def exchange():
             try:
                 self._send_block(CMD_READ_GROUP, bytes([group]))
                 title, data = self._recv_block()
@@ -422,16 +693,15 @@ class KWP1281Protocol:
             except (KLineError, ProtocolError) as e:
                 self.on_log(f"ReadGroup error: {e}")
                 return []
-            finally:
-                self._resume_keepalive()
+
+        return self._submit(exchange, key=(CMD_READ_GROUP, group))
 
     def login(self, pin_hi, pin_lo, workshop=0x00):
         """Send Login command (for 993 Drive Block workaround).
 
         Returns True on ACK.
         """
-        with self._lock:
-            self._pause_keepalive()
+        def exchange():
             try:
                 self._send_block(CMD_LOGIN, bytes([pin_hi, pin_lo, workshop]))
                 self._expect_ack()
@@ -439,16 +709,15 @@ class KWP1281Protocol:
             except ProtocolError as e:
                 self.on_log(f"Login failed: {e}")
                 return False
-            finally:
-                self._resume_keepalive()
+
+        return self._submit(exchange)
 
     def read_adaptation(self, channel):
         """Read adaptation channel.
 
         Returns (channel, value_16bit) or None.
         """
-        with self._lock:
-            self._pause_keepalive()
+        def exchange():
             try:
                 self._send_block(CMD_READ_ADAPT, bytes([channel]))
                 title, data = self._recv_block()
@@ -465,8 +734,8 @@ class KWP1281Protocol:
             except (KLineError, ProtocolError) as e:
                 self.on_log(f"ReadAdapt error: {e}")
                 return None
-            finally:
-                self._resume_keepalive()
+
+        return self._submit(exchange, key=(CMD_READ_ADAPT, channel))
 
     def write_adaptation(self, channel, value):
         """Write adaptation channel value.
@@ -477,8 +746,7 @@ class KWP1281Protocol:
 
         Returns True on ACK.
         """
-        with self._lock:
-            self._pause_keepalive()
+        def exchange():
             try:
                 v_hi = (value >> 8) & 0xFF
                 v_lo = value & 0xFF
@@ -488,62 +756,263 @@ class KWP1281Protocol:
             except ProtocolError as e:
                 self.on_log(f"WriteAdapt failed: {e}")
                 return False
+
+        return self._submit(exchange)
+
+    # ── I/O worker ──
+
+    def _submit(self, fn, priority=PRIORITY_INTERACTIVE, key=None):
+        """Run fn() on the I/O worker and return its result (or raise).
+
+        Commands run by priority, then in submission order. A command with
+        the same key as one still queued shares that command's result
+        instead of queueing another exchange. Without a worker (not
+        connected) or from the worker itself, fn runs inline. While another
+        thread runs reconnect(), the command waits for its outcome and
+        raises ConnectionLostError if the session could not be recovered.
+        """
+        me = threading.current_thread()
+        with self._queue_cv:
+            waited = False
+            while self._worker is None and self._recovering not in (None, me):
+                self._queue_cv.wait()
+                waited = True
+            if waited and self._worker is None:
+                raise ConnectionLostError("Session lost, reconnect failed")
+            worker = self._worker
+            inline = worker is None or worker is me
+            if not inline:
+                cmd = self._pending.get(key) if key is not None else None
+                if cmd is None:
+                    cmd = _Command(priority, next(self._seq), fn, key)
+                    heapq.heappush(self._queue, cmd)
+                    if key is not None:
+                        self._pending[key] = cmd
+                    self._queue_cv.notify()
+                elif priority < cmd.priority:
+                    cmd.priority = priority
+                    heapq.heapify(self._queue)
+        if inline:
+            return self._execute(fn)
+        return cmd.future.result()
+
+    def _execute(self, fn):
+        """Run one command exchange on the port."""
+        with self._lock:
+            if self._out_of_step and self.connected:
+                self._resync()
+            self._pause_keepalive()
+            # Nested commands (inline from the worker) count as one
+            metrics = self.metrics if self._busy == 1 else None
+            t0 = time.perf_counter() if metrics is not None else 0.0
+            try:
+                return fn()
+            except Exception:
+                if metrics is not None:
+                    metrics.inc("command_errors")
+                raise
             finally:
                 self._resume_keepalive()
+                if metrics is not None:
+                    metrics.inc("commands")
+                    metrics.observe("command", time.perf_counter() - t0)
+
+    def _start_worker(self):
+        """Start the I/O worker thread that serves the command queue."""
+        with self._queue_cv:
+            self._worker_stop = False
+            self._worker = threading.Thread(
+                target=self._worker_loop, daemon=True, name="kwp1281-io")
+            self._worker.start()
+
+    def _stop_worker(self, fail_queued=True):
+        """Stop the I/O worker after its current command; fail queued ones.
+
+        fail_queued=False keeps them for the next worker (session resume).
+        Called from the worker itself, it returns at once and the worker
+        exits when the current command is done.
+        """
+        with self._queue_cv:
+            worker, self._worker = self._worker, None
+            self._worker_stop = True
+            self._queue_cv.notify()
+        # A worker busy in reconnect() is not waited for: it exits on its own
+        if worker is not None and worker not in (threading.current_thread(), self._recovering):
+            worker.join(timeout=5.0)
+        if fail_queued:
+            self._fail_queued(ConnectionLostError("Connection closed"))
+
+    def _fail_queued(self, exc):
+        with self._queue_cv:
+            queued, self._queue = self._queue, []
+            self._pending.clear()
+        for cmd in queued:
+            if cmd.future.set_running_or_notify_cancel():
+                cmd.future.set_exception(exc)
+
+    def _worker_loop(self):
+        """Serve queued commands; send keep-alive when idle.
+
+        A failed keep-alive means the session is out of step or gone, so the
+        worker runs reconnect() (ACK probe, else full init); that starts a
+        fresh worker and this one exits.
+        """
+        me = threading.current_thread()
+        while True:
+            with self._queue_cv:
+                while not self._queue and not self._worker_stop:
+                    wait = None
+                    if self._keepalive_on:
+                        wait = self._last_activity + KEEPALIVE_INTERVAL - time.monotonic()
+                        if wait <= 0:
+                            break
+                    self._queue_cv.wait(wait)
+                if self._worker_stop or self._worker is not me:
+                    return
+                cmd = heapq.heappop(self._queue) if self._queue else None
+                if cmd is not None and cmd.key is not None:
+                    self._pending.pop(cmd.key, None)
+
+            if cmd is None:
+                if not self._send_keepalive():
+                    try:
+                        self.reconnect()
+                    except ConnectionLostError as e:
+                        self.on_log(f"Session lost: {e}")
+                    return
+                continue
+
+            if not cmd.future.set_running_or_notify_cancel():
+                continue
+            try:
+                cmd.future.set_result(self._execute(cmd.fn))
+            except BaseException as e:
+                cmd.future.set_exception(e)
 
     # ── Keep-alive ──
 
     def _start_keepalive(self):
-        """Start keep-alive daemon thread."""
-        self._keepalive_stop.clear()
-        self._keepalive_thread = threading.Thread(
-            target=self._keepalive_loop, daemon=True, name="kwp1281-keepalive")
-        self._keepalive_thread.start()
+        """Let the I/O worker send keep-alive ACKs when the bus is idle."""
+        with self._queue_cv:
+            self._keepalive_on = True
+            self._queue_cv.notify()
 
     def _stop_keepalive(self):
-        """Stop keep-alive thread."""
-        self._keepalive_stop.set()
-        if self._keepalive_thread and self._keepalive_thread.is_alive():
-            self._keepalive_thread.join(timeout=2.0)
-        self._keepalive_thread = None
+        """Stop idle keep-alive."""
+        with self._queue_cv:
+            self._keepalive_on = False
 
     def _pause_keepalive(self):
-        """Pause keep-alive while a command is active."""
-        self._cmd_active.set()
+        """Hook run before every command exchange (caller holds _lock)."""
+        self._busy += 1
 
     def _resume_keepalive(self):
-        """Resume keep-alive after command completes."""
-        self._cmd_active.clear()
-
-    def _keepalive_loop(self):
-        """Send ACK blocks every KEEPALIVE_INTERVAL seconds when idle."""
-        while not self._keepalive_stop.is_set():
-            self._keepalive_stop.wait(KEEPALIVE_INTERVAL)
-            if self._keepalive_stop.is_set():
-                break
+        """Hook run after every command exchange (caller holds _lock)."""
+        self._busy -= 1
 
-            # Skip if a command is running
-            if self._cmd_active.is_set():
-                continue
+    def _send_keepalive(self):
+        """One ACK/ACK exchange if the bus is still idle. False if the ECU is gone.
 
-            try:
-                with self._lock:
-                    self._send_ack()
-                    title, _ = self._recv_block()
-                    if title != RSP_ACK:
-                        self.on_log(f"Keep-alive: unexpected response 0x{title:02X}")
-            except Exception as e:
-                self.on_log(f"Keep-alive failed: {e}")
-                self.connected = False
-                self.on_state_change("disconnected")
-                break
+        Every block in either direction restarts the ECU's idle timer, so
+        this only runs after KEEPALIVE_INTERVAL of real bus silence, i.e.
+        KEEPALIVE_MARGIN before the ECU would drop the session; never during
+        live polling. Idleness is re-checked under the lock, so a command
+        that slipped in since the worker woke up cancels the keep-alive.
+        """
+        try:
+            with self._lock:
+                if self._busy or time.monotonic() - self._last_activity < KEEPALIVE_INTERVAL:
+                    return True
+                t0 = time.monotonic()
+                self._send_ack()
+                title, _ = self._recv_block()
+                if title != RSP_ACK:
+                    self.on_log(f"Keep-alive: unexpected response 0x{title:02X}")
+                dt = time.monotonic() - t0
+                self.keepalive_count += 1
+                self.keepalive_time += dt
+                if self.metrics is not None:
+                    self.metrics.inc("keepalives")
+                    self.metrics.observe("keepalive", dt)
+            return True
+        except Exception as e:
+            self.on_log(f"Keep-alive failed: {e}")
+            self._out_of_step = True
+            return False
+
+    # ── Capture ──
+
+    def start_capture(self, path):
+        """Record every K-Line byte of this session into a trace file.
+
+        See trace.ReplayProtocol for feeding the trace back.
+        """
+        from .trace import TraceWriter
+        self.stop_capture()
+        self._kline.attach_trace(TraceWriter(path))
+
+    def stop_capture(self):
+        """Stop recording and close the trace file."""
+        writer = self._kline.detach_trace()
+        if writer is not None:
+            writer.close()
 
     # ── Helpers ──
 
+    def block_deadline(self, tx_len=4, rx_len=4, title=None):
+        """Worst-case seconds for one request/response block exchange.
+
+        Derived from the measured latencies of the connected ECU, so callers
+        scale with the real ECU instead of the fixed INTERBYTE_TIMEOUT. The
+        reply deadline is only learned for ADAPTIVE_TITLES requests; any
+        other title (or None) gets the fixed first-byte deadline.
+        """
+        return self._kline.timing.block_deadline(tx_len, rx_len, title)
+
+    def timing_stats(self):
+        """Return the adaptive timing snapshot for the current session."""
+        return self._kline.timing.snapshot()
+
+    def keepalive_stats(self):
+        """Return keep-alive overhead for the current session.
+
+        overhead is the fraction of connected time spent in keep-alive
+        exchanges (bus time not available to commands or live data).
+        """
+        session = time.monotonic() - self._connected_at if self.connected else 0.0
+        return {
+            "count": self.keepalive_count,
+            "seconds": self.keepalive_time,
+            "session_seconds": session,
+            "overhead": self.keepalive_time / session if session > 0 else 0.0,
+        }
+
+    def enable_metrics(self, metrics=None):
+        """Record latency histograms and counters (see metrics.Metrics).
+
+        The same object is shared with the serial layer; pass one in to
+        aggregate several sessions. Returns the active Metrics.
+        """
+        from .metrics import Metrics
+        if metrics is None:
+            metrics = self.metrics or Metrics()
+        self.metrics = self._kline.metrics = metrics
+        return metrics
+
+    def disable_metrics(self):
+        """Stop recording. Returns the detached Metrics (or None)."""
+        metrics, self.metrics = self.metrics, None
+        self._kline.metrics = None
+        return metrics
+
     def _log_hex(self, direction, data):
-        """Log a block as hex dump."""
-        hex_str = " ".join(f"{b:02X}" for b in data)
-        self.on_log(f"  {direction}: [{hex_str}]")
+        """Keep a block as a HexLine; on_log only ever sees its rendered string."""
+        line = HexLine(direction, data)
+        self.block_ring.append(line)
+        if self.on_block is not None:
+            self.on_block(line)
+        elif self._log_blocks:
+            self.on_log(str(line))
 
     def stop_live(self):
         """No-op for API compatibility with DemoProtocol."""
@@ -0,0 +1,179 @@
+"""Binary live data recorder - fixed-width records, memory-mapped NumPy reader.
+
+File layout (little-endian):
+    header  32 bytes: magic "KKLREC01", u16 version, u16 record size,
+                      4s model (ASCII, NUL padded), f8 start time, 8 pad
+    records 12 bytes: f8 time.time(), u1 ecu address, u1 register, u1 raw, 1 pad
+
+One hour at 10 Hz over eight channels is 288,000 records, about 3.3 MB.
+Writing needs only the standard library; reading needs NumPy.
+
+Records are stored in arrival order with every channel interleaved, so a
+file can be appended to without knowing its channels up front. The flip
+side is that a channel is not one contiguous slice of the file and cannot
+be a zero-copy view: Recording groups the rows by channel once (a stable
+argsort) and gathers each channel's arrays on first use, then caches them.
+"""
+
+import os
+import struct
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # reader only
+    np = None
+
+MAGIC = b"KKLREC01"
+VERSION = 1
+
+_HEADER_FMT = "<8sHH4sd8x"
+HEADER_SIZE = struct.calcsize(_HEADER_FMT)
+_RECORD_FMT = "<dBBBx"
+RECORD_SIZE = struct.calcsize(_RECORD_FMT)
+
+RECORD_DTYPE = None if np is None else np.dtype(
+    [("t", "<f8"), ("ecu", "u1"), ("register", "u1"), ("raw", "u1"), ("_pad", "u1")])
+
+
+class RecordingError(Exception):
+    """Invalid or incompatible recording file."""
+
+
+def _read_header(f):
+    head = f.read(HEADER_SIZE)
+    if len(head) < HEADER_SIZE:
+        raise RecordingError("Truncated header")
+    magic, version, rec_size, model, start = struct.unpack(_HEADER_FMT, head)
+    if magic != MAGIC or version != VERSION or rec_size != RECORD_SIZE:
+        raise RecordingError(f"Not a v{VERSION} recording")
+    return model.rstrip(b"\0").decode("ascii"), start
+
+
+class Recorder:
+    """Appends (timestamp, ecu, register, raw_byte) records to a file.
+
+    Records are packed into a preallocated batch buffer and written every
+    `batch` records (and on flush/close). A new file's header start time is
+    `start`, or time.time() when the recorder opens. Thread-safe.
+
+    Usage:
+        with Recorder("drive.kkl", model="964") as rec:
+            rec.append(time.time(), 0x10, 0x3A, 21)
+    """
+
+    def __init__(self, path, model="", start=None, batch=256):
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if new:
+            self.start = time.time() if start is None else start
+            self._f = open(path, "wb")
+            self._f.write(struct.pack(_HEADER_FMT, MAGIC, VERSION, RECORD_SIZE,
+                                      model.encode("ascii")[:4], self.start))
+            self.model = model
+        else:
+            with open(path, "rb") as f:
+                self.model, self.start = _read_header(f)
+            self._f = open(path, "ab")
+        self._buf = bytearray(batch * RECORD_SIZE)
+        self._batch = batch
+        self._n = 0
+        self._lock = threading.Lock()
+
+    def append(self, t, ecu, register, raw):
+        """Append one record."""
+        with self._lock:
+            struct.pack_into(_RECORD_FMT, self._buf, self._n * RECORD_SIZE,
+                             t, ecu, register, raw)
+            self._n += 1
+            if self._n == self._batch:
+                self._write()
+
+    def append_samples(self, ecu, samples):
+        """Append poller.Sample records for one ECU."""
+        with self._lock:
+            for s in samples:
+                struct.pack_into(_RECORD_FMT, self._buf, self._n * RECORD_SIZE,
+                                 s.t, ecu, s.register, s.raw)
+                self._n += 1
+                if self._n == self._batch:
+                    self._write()
+
+    def flush(self):
+        """Write buffered records to disk."""
+        with self._lock:
+            self._write()
+
+    def close(self):
+        """Flush and close the file."""
+        with self._lock:
+            if self._f is None:
+                return
+            self._write()
+            self._f.close()
+            self._f = None
+
+    def _write(self):
+        if self._n:
+            self._f.write(memoryview(self._buf)[:self._n * RECORD_SIZE])
+            self._f.flush()
+            self._n = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    """Read-only, memory-mapped view of a recording file.
+
+    `records` is a NumPy structured array (fields t, ecu, register, raw)
+    mapped straight from the file; nothing is parsed on open. A trailing
+    partial record from an interrupted write is ignored.
+    """
+
+    def __init__(self, path):
+        if np is None:
+            raise ImportError("numpy is required to read recordings")
+        with open(path, "rb") as f:
+            self.model, self.start = _read_header(f)
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+        if count:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r",
+                                     offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._rows = None       # {key: row indices}, built on first use
+        self._channels = {}     # {key: (t, raw)} gathered per channel
+
+    def __len__(self):
+        return len(self.records)
+
+    def _groups(self):
+        """Row indices per channel key (ecu << 8 | register), in recording order."""
+        if self._rows is None:
+            keys = (self.records["ecu"].astype(np.uint16) << 8) | self.records["register"]
+            channels, inverse = np.unique(keys, return_inverse=True)
+            order = np.argsort(inverse, kind="stable")
+            bounds = np.cumsum(np.bincount(inverse, minlength=len(channels)))[:-1]
+            self._rows = dict(zip(channels.tolist(), np.split(order, bounds)))
+        return self._rows
+
+    def channels(self):
+        """Return sorted list of (ecu, register) pairs present in the file."""
+        return [(k >> 8, k & 0xFF) for k in self._groups()]
+
+    def channel(self, ecu, register):
+        """Return read-only (t, raw) arrays for one channel, in recording order."""
+        key = (ecu << 8) | register
+        arrays = self._channels.get(key)
+        if arrays is None:
+            rows = self._groups().get(key, np.zeros(0, dtype=np.intp))
+            arrays = (self.records["t"][rows], self.records["raw"][rows])
+            for a in arrays:
+                a.flags.writeable = False
+            self._channels[key] = arrays
+        return arrays
@@ -2,10 +2,16 @@
 
 import sys
 import time
+import errno
 import struct
 import serial
+from functools import lru_cache
 
-from .constants import BIT_TIME_5BAUD, KEYWORD_ACK_DELAY, INTERBYTE_TIMEOUT
+from .constants import (
+    BIT_TIME_5BAUD, BITBANG_SPIN, KEYWORD_ACK_DELAY, INTERBYTE_TIMEOUT,
+    SYNC_BYTE, SYNC_MIN_MARGIN, SYNC_TIMEOUT,
+)
+from .timing import AdaptiveTiming
 
 
 class KLineError(Exception):
@@ -16,6 +22,139 @@ class KLineTimeoutError(KLineError):
     """Byte read timed out."""
 
 
+# ── Baudrate detection ──
+
+def uart_decode(data, baud, rate):
+    """Model what an 8N1 UART at `rate` reads from bytes sent at `baud`.
+
+    The bytes are sent back to back, followed by idle (HIGH) line. The UART
+    starts a frame on a falling edge (or on a still-LOW line after a stop
+    bit), samples mid-bit, drops a false start (start bit sampled HIGH) and -
+    like the Linux tty layer - delivers a frame with a framing error (LOW
+    stop bit) as 0x00.
+
+    Returns (received_bytes, margin): margin is the smallest distance of a
+    sample of the first frame from a line edge, in bits at `rate`; near 0
+    that byte depends on clock tolerances and cannot be relied on. Frames
+    after a framing error depend on how the UART resynchronizes and are a
+    best guess (16550-style: the LOW stop bit is taken as the next start).
+    """
+    bits = []
+    for b in data:
+        bits += [0] + [(b >> i) & 1 for i in range(8)] + [1]
+    n = len(bits)
+
+    def level(t):
+        i = int(t * baud)
+        return bits[i] if 0 <= i < n else 1
+
+    falls = [i / baud for i in range(n) if bits[i] == 0 and (i == 0 or bits[i - 1])]
+    edges = [i / baud for i in range(n + 1)]
+    out = bytearray()
+    margin = None
+    t = 0.0
+    while True:
+        start = next((e for e in falls if e >= t), None)
+        if level(t) == 0 and t > 0:
+            start = t
+        if start is None:
+            break
+        samples = [start + (i + 0.5) / rate for i in range(10)]
+        if margin is None:
+            margin = min(abs(ts - e) for ts in samples for e in edges) * rate
+        if level(samples[0]):
+            t = samples[0]  # false start: wait for the next falling edge
+            continue
+        value = 0
+        for i in range(1, 9):
+            value |= level(samples[i]) << (i - 1)
+        stop = samples[9]
+        out.append(value if level(stop) else 0x00)
+        t = stop
+    return bytes(out), (0.5 if margin is None else margin)
+
+
+# First byte an 8N1 UART at `rate` reads from the sync byte sent at `baud`,
+# derived by hand rather than with uart_decode(). 0x55 goes out LSB first
+# as ten alternating bits starting LOW (start 0, data 1 0 1 0 1 0 1 0,
+# stop 1), so ECU bit k is LOW for even k and the line idles HIGH from k=10.
+# The UART samples its bit i at (i + 0.5) * baud / rate ECU bits after the
+# falling edge; its stop bit sampled LOW is a framing error, read as 0x00;
+# its start bit sampled HIGH is a false start and yields nothing (None).
+# Comments: ECU bit index of the start, b0..b7 and stop samples; "~" marks
+# samples within SYNC_MIN_MARGIN UART bits of an edge, which real clock
+# tolerances can flip. A pair mapped to None leaves no sync byte to match,
+# so that ECU cannot be detected from a session opened at `rate`.
+SYNC_FIRST_BYTES = {
+    # (baud, rate): byte
+    (10400, 9600): 0xB5,  # 0 1 2 3 ~4 ~5 ~7 ~8 9 10
+    (10400, 8800): 0xA9,  # 0 1 ~2 ~4 5 6 7 ~8 ~10 11
+    (10400, 4800): None,  # ~1: start sampled HIGH at every falling edge
+    (9600, 10400): 0x00,  # 0 1 2 3 4 ~5 ~6 ~6 7 8: stop LOW
+    (9600, 8800): 0xA5,   # 0 1 2 3 ~4 ~6 ~7 8 9 10
+    (9600, 4800): None,   # ~1: every sample sits on an ECU bit edge
+    (8800, 10400): 0x00,  # 0 1 ~2 ~2 3 4 5 6 7 ~8: stop LOW
+    (8800, 9600): 0x00,   # 0 1 2 3 ~4 ~5 ~5 ~6 7 8: stop LOW
+    (8800, 4800): 0xF0,   # ~0 ~2 4 6 ~8 ~10 11 13 15 17
+    (4800, 10400): 0x00,  # 0 0 1 1 2 2 ~3 3 3 4: stop LOW
+    (4800, 9600): 0x00,   # 0 0 1 1 2 2 3 3 4 4: stop LOW
+    (4800, 8800): 0x36,   # 0 0 1 1 2 ~3 3 4 4 5
+}
+
+
+@lru_cache(maxsize=None)
+def sync_signatures(rate, candidates):
+    """What the sync byte 0x55 from each candidate baudrate reads as at `rate`.
+
+    A signature is robust if no sample of its first frame is near an edge
+    and its first byte agrees with SYNC_FIRST_BYTES (where that pair is
+    listed), so the model is not trusted on its own.
+    Returns [(baud, signature, robust), ...], robust signatures first.
+    """
+    signatures = []
+    for baud in candidates:
+        if baud == rate:
+            continue
+        signature, margin = uart_decode(bytes([SYNC_BYTE]), baud, rate)
+        robust = margin >= SYNC_MIN_MARGIN
+        if (baud, rate) in SYNC_FIRST_BYTES:
+            robust = robust and signature[:1] == _first_byte(baud, rate)
+        signatures.append((baud, signature, robust))
+    signatures.sort(key=lambda s: not s[2])
+    return signatures
+
+
+def _first_byte(baud, rate):
+    b = SYNC_FIRST_BYTES[(baud, rate)]
+    return b"" if b is None else bytes([b])
+
+
+def match_sync(data, rate, candidates):
+    """Identify the ECU baudrate from the bytes its sync read as at `rate`.
+
+    The candidate whose signature shares the longest prefix with `data`
+    wins; ties go to a signature `data` matches completely, then to robust
+    signatures. Returns the baudrate or None.
+
+    Assumes a frame with a framing error arrives as a 0x00 byte. That is
+    the Linux tty default with IGNPAR and PARMRK clear (as pyserial leaves
+    them), not something pyserial guarantees: other drivers may drop the
+    byte (IGNPAR) or mark it (PARMRK: FF 00 xx), and then detection fails
+    for the mismatches that produce framing errors.
+    """
+    if data[:1] == bytes([SYNC_BYTE]):
+        return rate
+    best, best_score = None, (0, False)
+    for baud, signature, _robust in sync_signatures(rate, tuple(candidates)):
+        k = 0
+        while k < min(len(data), len(signature)) and data[k] == signature[k]:
+            k += 1
+        score = (k, data == signature)
+        if k and score > best_score:
+            best, best_score = baud, score
+    return best
+
+
 class KLineSerial:
     """PySerial wrapper for K-Line communication with RTS bit-bang 5-baud init.
 
@@ -24,14 +163,50 @@ class KLineSerial:
       CLRRTS = K-Line HIGH
 
     Set rts_inverted=False for direct-logic interfaces.
+
+    Set local_echo=True for single-wire interfaces where every transmitted
+    byte is read back on RX (FTDI + L9637D wired-OR "dumb cable"). Written
+    bytes are tracked and stripped from the front of the next read, so the
+    echo and the ECU reply are drained in one bulk read.
+
+    Pseudo-terminals (virtual_ecu) have no modem lines; there the 5-baud
+    address is sent as a plain byte after the 2 s frame time.
+
+    perform_handshake() can detect the ECU's baudrate from the garbled sync
+    byte (see uart_decode) and switch to it before the keywords.
+
+    Block I/O measures ECU latencies into self.timing and waits only as long
+    as the derived deadlines (see timing.AdaptiveTiming); adaptive_timing=False
+    keeps the fixed INTERBYTE_TIMEOUT. With self.metrics set (a
+    metrics.Metrics), it also records ACK round trips, block durations,
+    timeouts and bad ACKs.
     """
 
-    def __init__(self, rts_inverted=True):
+    def __init__(self, rts_inverted=True, local_echo=False, adaptive_timing=True):
         self._ser = None
         self._rts_inverted = rts_inverted
+        self._local_echo = local_echo
+        self._echo = bytearray()       # written bytes not yet read back
+        self.timing = AdaptiveTiming(enabled=adaptive_timing)
+        self._tx_done = None           # perf_counter() at end of last sent block
+        self._tx_title = None          # title of that block (selects the reply deadline)
+        self._trace = None             # trace.TraceWriter while capturing
+        self._modem_lines = True       # False on pseudo-terminals
+        self._txbuf = bytearray(1)     # reused for every single-byte write
+        self._rxbuf = bytearray(256)   # max block length is 0xFF
+        self.init_report = None        # edge timing of the last 5-baud frame
+        self.metrics = None            # metrics.Metrics while enabled
 
     def open(self, port, baudrate=9600):
-        """Open serial port. 8N1, no flow control."""
+        """Open serial port. 8N1, no flow control.
+
+        If this port is already open (e.g. the next ECU of a sweep), it is
+        reused: only the baudrate is reset and the buffers are purged.
+        """
+        if self.is_open and self._ser.port == port:
+            self.set_baudrate(baudrate)
+            self._purge()
+            return
         self._ser = serial.Serial(
             port=port,
             baudrate=baudrate,
@@ -43,10 +218,36 @@ class KLineSerial:
             rtscts=False,
             dsrdtr=False,
         )
-        self._ser.rts = False
-        self._ser.dtr = False
-        self._ser.reset_input_buffer()
-        self._ser.reset_output_buffer()
+        try:
+            self._ser.rts = False
+            self._ser.dtr = False
+            self._modem_lines = True
+        except OSError as e:
+            if e.errno != errno.ENOTTY:
+                raise
+            self._modem_lines = False
+        if self._trace is not None:
+            self._wrap_capture()
+        self._purge()
+
+    def attach_trace(self, writer):
+        """Record all port traffic into a trace.TraceWriter from now on."""
+        self._trace = writer
+        if self._ser is not None:
+            self._wrap_capture()
+
+    def detach_trace(self):
+        """Stop recording. Returns the detached writer (not closed)."""
+        from .trace import CaptureSerial
+        writer, self._trace = self._trace, None
+        if isinstance(self._ser, CaptureSerial):
+            self._ser = self._ser._ser
+        return writer
+
+    def _wrap_capture(self):
+        from .trace import CaptureSerial
+        if not isinstance(self._ser, CaptureSerial):
+            self._ser = CaptureSerial(self._ser, self._trace)
 
     def close(self):
         """Close serial port."""
@@ -70,28 +271,132 @@ class KLineSerial:
         else:
             self._ser.rts = high
 
-    def send_5baud_address(self, address):
+    @staticmethod
+    def timeline_5baud(address, start):
+        """Return the K-Line transitions of one 5-baud address frame.
+
+        10 bits: 1 start (LOW) + 8 data LSB-first + 1 stop (HIGH) = 2 seconds.
+        Returns [(deadline, level), ...] on absolute monotonic time, with runs
+        of equal bits merged into one edge; the final entry (level None) is
+        the end of the stop bit.
+        """
+        bits = [False] + [bool((address >> i) & 1) for i in range(8)] + [True]
+        timeline = []
+        level = None
+        for i, bit in enumerate(bits):
+            if bit != level:
+                timeline.append((start + i * BIT_TIME_5BAUD, bit))
+                level = bit
+        timeline.append((start + len(bits) * BIT_TIME_5BAUD, None))
+        return timeline
+
+    @staticmethod
+    def _wait_until(deadline):
+        """Sleep, then spin, until the monotonic deadline."""
+        remaining = deadline - time.monotonic()
+        if remaining > BITBANG_SPIN:
+            time.sleep(remaining - BITBANG_SPIN)
+        while time.monotonic() < deadline:
+            pass
+
+    def send_5baud_address(self, address, start_at=None):
         """Send ECU address at 5 baud using RTS bit-bang.
 
-        10 bits total: 1 start (LOW) + 8 data LSB-first + 1 stop (HIGH) = 2 seconds.
+        Every edge is driven against its absolute deadline from
+        timeline_5baud(), so sleep overshoot does not accumulate over the
+        2 s frame. start_at (monotonic) schedules the start bit, e.g. after
+        the bus idle time following an EndComm. The measured lateness of
+        each edge is kept in self.init_report.
         """
-        # Start bit (LOW)
-        self._set_kline(False)
-        time.sleep(BIT_TIME_5BAUD)
+        start = max(start_at or 0.0, time.monotonic() + BITBANG_SPIN)
+        timeline = self.timeline_5baud(address, start)
+        self._wait_until(start)
+        if self._trace is not None:
+            self._trace.record_init(address)
+
+        if not self._modem_lines:
+            # Pseudo-terminal: nothing to bit-bang, keep the frame time and
+            # hand the address to the virtual ECU as a plain byte
+            self._wait_until(timeline[-1][0])
+            self._report_5baud([time.monotonic() - timeline[-1][0]], start)
+            self._purge()
+            self._write(address)
+            self._ser.flush()
+            return
+
+        lateness = []
+        for deadline, level in timeline:
+            self._wait_until(deadline)
+            if level is not None:
+                self._set_kline(level)
+            lateness.append(time.monotonic() - deadline)
+        self._report_5baud(lateness, start)
+
+        # Purge any garbage in buffers
+        self._purge()
 
-        # 8 data bits, LSB first
-        for i in range(8):
-            bit = (address >> i) & 1
-            self._set_kline(bool(bit))
-            time.sleep(BIT_TIME_5BAUD)
+    def _report_5baud(self, lateness, start):
+        self.init_report = {
+            "edges": len(lateness),
+            "max_jitter_ms": max(lateness) * 1000,
+            "mean_jitter_ms": sum(lateness) / len(lateness) * 1000,
+            "frame_s": time.monotonic() - start,
+        }
 
-        # Stop bit (HIGH)
-        self._set_kline(True)
-        time.sleep(BIT_TIME_5BAUD)
+    def _purge(self):
+        """Drop pending RX/TX data and any outstanding echo.
 
-        # Purge any garbage in buffers
+        Called at open and after 5-baud init, i.e. when a new ECU session
+        starts, so latency statistics are reset too.
+        """
         self._ser.reset_input_buffer()
         self._ser.reset_output_buffer()
+        self._echo.clear()
+        self.timing.reset()
+        self._tx_done = None
+        self._tx_title = None
+
+    def discard_input(self):
+        """Drop unread RX bytes and pending echo, keeping timing statistics.
+
+        For resynchronizing a running session after a glitch, where _purge()
+        would also forget the ECU's measured latencies.
+        """
+        self._ser.reset_input_buffer()
+        self._echo.clear()
+        self._tx_done = None
+        self._tx_title = None
+
+    def settle(self, quiet, limit):
+        """Discard input until the line has been quiet for `quiet` seconds.
+
+        After a failed exchange the ECU may still be sending the rest of a
+        block; gives up waiting after `limit` seconds.
+        """
+        deadline = time.monotonic() + limit
+        while True:
+            self.discard_input()
+            time.sleep(quiet)
+            if not self._ser.in_waiting or time.monotonic() >= deadline:
+                self.discard_input()
+                return
+
+    @property
+    def baudrate(self):
+        """Current port baudrate (e.g. as detected by perform_handshake)."""
+        return self._ser.baudrate
+
+    def _detect_baudrate(self, first, baudrate, candidates):
+        """Match a garbled sync byte against the candidate baudrates.
+
+        Waits out the slowest candidate's sync frame, then takes everything
+        it produced in one read. Returns the detected baudrate or None.
+        """
+        if not candidates:
+            return None
+        time.sleep(10.0 / min(candidates))
+        data = bytes([first]) + self._ser.read(self._ser.in_waiting)
+        return match_sync(data, baudrate, candidates)
 
     def set_baudrate(self, baudrate):
         """Change baudrate after 5-baud init.
@@ -125,19 +430,50 @@ class KLineSerial:
             self._ser.timeout = timeout
 
         try:
-            data = self._ser.read(1)
-            if not data:
-                raise KLineTimeoutError("Read timeout")
-            return data[0]
+            return self._read(1)[0]
         finally:
             if timeout is not None:
                 self._ser.timeout = old_timeout
 
     def write_byte(self, b):
         """Write a single byte."""
-        self._ser.write(bytes([b & 0xFF]))
+        self._write(b)
         self._ser.flush()
 
+    def _write(self, b):
+        """Write one byte through the shared buffer, tracking it for echo."""
+        self._txbuf[0] = b & 0xFF
+        self._ser.write(self._txbuf)
+        if self._local_echo:
+            self._echo.append(b & 0xFF)
+
+    def _read(self, n):
+        """Read n bytes, first stripping the echo of bytes we wrote.
+
+        In local_echo mode the echo and the requested bytes come back in a
+        single read(). Raises KLineTimeoutError on short reads, KLineError
+        if the echo does not match what was written.
+        """
+        echo = self._echo
+        if not echo:
+            data = self._ser.read(n)
+            if len(data) < n:
+                raise KLineTimeoutError("Read timeout")
+            return data
+
+        k = len(echo)
+        data = self._ser.read(k + n)
+        wrote = bytes(echo)
+        echo.clear()  # consumed or lost: never expect it again on the next read
+        if len(data) < k:
+            raise KLineTimeoutError("Echo timeout")
+        if data[:k] != wrote:
+            raise KLineError(
+                f"Echo mismatch: wrote {wrote.hex(' ').upper()}, read {data[:k].hex(' ').upper()}")
+        if len(data) < k + n:
+            raise KLineTimeoutError("Read timeout")
+        return data[k:]
+
     def send_byte_with_ack(self, b):
         """Send a byte and wait for ECU to return its complement.
 
@@ -148,10 +484,118 @@ class KLineSerial:
         ack = self.read_byte(timeout=INTERBYTE_TIMEOUT)
         expected = (~b) & 0xFF
         if ack != expected:
+            if self.metrics is not None:
+                self.metrics.inc("bad_acks")
             raise KLineError(
                 f"Bad ACK: sent 0x{b:02X}, expected 0x{expected:02X}, got 0x{ack:02X}")
         return ack
 
+    def _set_timeout(self, timeout):
+        """Set the read timeout, skipping the termios round trip if unchanged."""
+        if self._ser.timeout != timeout:
+            self._ser.timeout = timeout
+
+    def send_block_with_acks(self, block):
+        """Send a whole block with the inter-byte ACK protocol.
+
+        Same wire behaviour as send_byte_with_ack() for every byte followed by
+        write_byte() for the ETX, but the read timeout is set once per block
+        (to the adaptive byte deadline), only the final byte is flushed, and
+        one preallocated buffer is reused.
+
+        Raises KLineTimeoutError if an ACK is missing, KLineError if wrong.
+        """
+        timing = self.timing
+        metrics = self.metrics
+        clock = time.perf_counter
+        last = len(block) - 1
+        self._set_timeout(timing.byte_timeout)
+        start = clock()
+
+        for i, b in enumerate(block):
+            t0 = clock()
+            self._write(b)
+            if i == last:
+                break  # ETX: no ACK expected
+            try:
+                ack = self._read(1)[0]
+            except KLineTimeoutError:
+                timing.record_timeout()
+                if metrics is not None:
+                    metrics.inc("timeouts")
+                raise
+            dt = clock() - t0
+            timing.record_ack(dt)
+            if metrics is not None:
+                metrics.observe("ack_rtt", dt)
+            expected = b ^ 0xFF
+            if ack != expected:
+                if metrics is not None:
+                    metrics.inc("bad_acks")
+                raise KLineError(
+                    f"Bad ACK: sent 0x{b:02X}, expected 0x{expected:02X}, got 0x{ack:02X}")
+
+        self._ser.flush()
+        self._tx_done = clock()
+        self._tx_title = block[2]
+        if metrics is not None:
+            metrics.observe("block_send", self._tx_done - start)
+
+    def recv_block_with_acks(self):
+        """Receive a whole block, sending the complement of every byte but ETX.
+
+        Returns the raw block bytes [Len, Cnt, Title, ...Data, ETX].
+        Raises KLineTimeoutError if a byte is missing.
+        """
+        buf = self._rxbuf
+        timing = self.timing
+        metrics = self.metrics
+        clock = time.perf_counter
+
+        # First byte: the ECU may still be processing our request
+        title = self._tx_title
+        self._tx_title = None
+        self._set_timeout(timing.response_timeout_for(title))
+        try:
+            length = self._read(1)[0]
+        except KLineTimeoutError:
+            timing.record_timeout(response=True, title=title)
+            if metrics is not None:
+                metrics.inc("timeouts")
+            raise
+        start = clock()
+        if self._tx_done is not None:
+            timing.record_response(start - self._tx_done, title)
+            if metrics is not None:
+                metrics.observe("response", start - self._tx_done)
+            self._tx_done = None
+        if length < 4:
+            raise KLineError(f"Invalid block length 0x{length:02X}")
+        buf[0] = length
+
+        # Each byte is requested by ACKing the previous one; ETX is not ACKed
+        self._set_timeout(timing.byte_timeout)
+        b = length
+        for i in range(1, length):
+            t0 = clock()
+            self._write(b ^ 0xFF)
+            try:
+                b = self._read(1)[0]
+            except KLineTimeoutError:
+                timing.record_timeout()
+                if metrics is not None:
+                    metrics.inc("timeouts")
+                raise
+            dt = clock() - t0
+            timing.record_ack(dt)
+            if metrics is not None:
+                metrics.observe("ack_rtt", dt)
+            buf[i] = b
+
+        if metrics is not None:
+            metrics.observe("block_recv", clock() - start)
+        return bytes(buf[:length])
+
     def recv_byte_with_ack(self):
         """Receive a byte and send its complement back.
 
@@ -162,22 +606,31 @@ class KLineSerial:
         self.write_byte(complement)
         return b
 
-    def perform_handshake(self, baudrate):
+    def perform_handshake(self, baudrate, candidates=()):
         """Perform the KWP1281 handshake after 5-baud init.
 
         1. Wait for sync byte 0x55
         2. Receive keyword1, send ACK
         3. Receive keyword2, wait 30ms, send ACK (~keyword2)
 
+        baudrate is the expected rate. If the sync byte reads as something
+        else and candidates are given, the rest of the sync frame is read
+        in the same buffered read and matched against what 0x55 at each
+        candidate rate looks like at this one; the port then switches to the
+        matching rate (see self.baudrate) before the keywords arrive.
+
         Returns (keyword1, keyword2) on success.
         Raises KLineError on failure.
         """
         self.set_baudrate(baudrate)
 
         # Wait for sync 0x55
-        sync = self.read_byte(timeout=1.0)
-        if sync != 0x55:
-            raise KLineError(f"Expected sync 0x55, got 0x{sync:02X}")
+        sync = self.read_byte(timeout=SYNC_TIMEOUT)
+        if sync != SYNC_BYTE:
+            rate = self._detect_baudrate(sync, baudrate, candidates)
+            if rate is None:
+                raise KLineError(f"Expected sync 0x55, got 0x{sync:02X}")
+            self.set_baudrate(rate)
 
         # Receive keyword1, send complement
         kw1 = self.recv_byte_with_ack()
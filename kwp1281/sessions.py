@@ -0,0 +1,304 @@
+"""Multi-port session manager - one KWP1281 session per K-Line adapter.
+
+Each Session owns a KWP1281Protocol on its own port. A supervisor thread
+connects it, reconnects it after a lost link and forwards live samples;
+commands run in submission order on a single-worker executor and return
+futures, so N cars on N adapters are serviced in parallel. Keep-alives
+and block I/O stay on the protocol's own I/O worker. The manager fans
+out commands and merges logs, blocks, state changes, faults and live
+samples from all sessions into one event queue tagged with the port.
+Blocks arrive as HexLines, so their hex text is only built by a consumer
+that renders them.
+
+Usage:
+    mgr = SessionManager()
+    mgr.add("/dev/ttyUSB0", "964", "Motronic M2.1", 0x10, 8800)
+    mgr.add("/dev/ttyUSB1", "993", "Motronic M5.2", 0x10, 9600)
+    mgr.start_all()
+    mgr.wait_connected(timeout=10)
+    faults = mgr.read_faults()            # {port: [FaultRecord] or exception}
+    mgr.start_live()
+    event = mgr.events.get()              # SessionEvent(port, kind, data, t)
+    mgr.stop_all()
+"""
+
+import time
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from .poller import LivePoller
+from .protocol import KWP1281Protocol, ConnectionLostError
+
+# kind: "log", "block" (a HexLine), "state", "connected", "faults", "samples"
+# or "error"
+SessionEvent = namedtuple("SessionEvent", "port kind data t")
+
+
+class Session:
+    """One ECU session on one port, kept connected by a supervisor thread.
+
+    Args:
+        port, model, ecu_name, ecu_address, baudrate: as KWP1281Protocol.connect()
+        emit: callback(SessionEvent) receiving this session's events
+        **proto_kwargs: passed to KWP1281Protocol (local_echo, ...)
+    """
+
+    def __init__(self, port, model, ecu_name, ecu_address, baudrate, emit=None,
+                 **proto_kwargs):
+        self.port = port
+        self.model = model
+        self.ecu_name = ecu_name
+        self.ecu_address = ecu_address
+        self.baudrate = baudrate
+        self.emit = emit or (lambda event: None)
+        self.proto = KWP1281Protocol(
+            on_log=lambda msg: self._emit("log", msg),
+            on_block=lambda line: self._emit("block", line),
+            on_state_change=lambda state: self._emit("state", state),
+            **proto_kwargs)
+        self.poller = None
+        self.error = None
+        self.connected = threading.Event()
+        self._ended = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+
+    def _emit(self, kind, data):
+        self.emit(SessionEvent(self.port, kind, data, time.time()))
+
+    # ── Lifecycle ──
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Connect on a daemon supervisor thread and accept commands."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._ended.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"kwp1281-cmd-{self.port}")
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f"kwp1281-session-{self.port}")
+        self._thread.start()
+
+    def stop(self):
+        """Stop live data, disconnect and end the supervisor thread."""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def _run(self):
+        try:
+            part_number = self.proto.connect(self.port, self.model, self.ecu_name,
+                                             self.ecu_address, self.baudrate)
+        except Exception as e:
+            self.error = e
+            self._emit("error", e)
+            self._end()
+            return
+
+        self.connected.set()
+        self._emit("connected", part_number)
+        try:
+            while not self._stop.wait(0.1):
+                if not self.proto.connected and not self._reconnect():
+                    break
+                self._drain_samples()
+        finally:
+            self._end()
+            self._stop_poller()
+            self._drain_samples()
+            self.proto.disconnect()
+
+    def _end(self):
+        # Refuse new commands; queued ones still run and fail in _call()
+        self._ended.set()
+        self.connected.clear()
+        self._executor.shutdown(wait=False)
+
+    def _reconnect(self):
+        """Recover a lost session (ACK probe, else full init). False if gone."""
+        self.connected.clear()
+        try:
+            part_number = self.proto.reconnect()
+        except ConnectionLostError as e:
+            self.error = e
+            self._emit("error", e)
+            return False
+        self.connected.set()
+        self._emit("connected", part_number)
+        return True
+
+    # ── Commands ──
+
+    def submit(self, fn):
+        """Run fn(proto) once the session is connected. Returns a Future."""
+        try:
+            if self._executor is not None:
+                return self._executor.submit(self._call, fn)
+        except RuntimeError:                      # executor already shut down
+            pass
+        future = Future()
+        future.set_exception(ConnectionLostError(f"{self.port}: session not running"))
+        return future
+
+    def _call(self, fn):
+        while not self.connected.wait(0.1):
+            if self._ended.is_set():
+                raise ConnectionLostError(f"{self.port}: session ended") from self.error
+        try:
+            return fn(self.proto)
+        except Exception as e:
+            self._emit("error", e)
+            raise
+
+    def read_faults(self):
+        """Queue a fault read; the result is also emitted as a "faults" event."""
+        def read(proto):
+            faults = proto.read_faults()
+            self._emit("faults", faults)
+            return faults
+        return self.submit(read)
+
+    # ── Live data ──
+
+    def start_live(self, params=None, rates=None):
+        """Start a LivePoller; its samples are emitted as "samples" events."""
+        def start(proto):
+            self._stop_poller()
+            self.poller = LivePoller(proto, params=params, rates=rates,
+                                     on_error=lambda e: self._emit("error", e))
+            self.poller.start()
+        return self.submit(start)
+
+    def stop_live(self):
+        return self.submit(lambda proto: self._stop_poller())
+
+    def latest(self):
+        """Return {name: Sample} with the newest live sample per parameter."""
+        return self.poller.ring.latest() if self.poller else {}
+
+    def _stop_poller(self):
+        if self.poller is not None:
+            self.poller.stop()
+
+    def _drain_samples(self):
+        if self.poller is not None:
+            samples = self.poller.ring.drain()
+            if samples:
+                self._emit("samples", samples)
+
+
+class SessionManager:
+    """Runs and coordinates one Session per port.
+
+    All sessions report into `events`, a queue of SessionEvents; `on_event`
+    additionally receives every event on the emitting session's thread.
+    """
+
+    def __init__(self, on_event=None):
+        self.sessions = {}
+        self.events = queue.Queue()
+        self.on_event = on_event
+
+    def _emit(self, event):
+        self.events.put(event)
+        if self.on_event:
+            self.on_event(event)
+
+    def add(self, port, model, ecu_name, ecu_address, baudrate, **proto_kwargs):
+        """Register a session for a port (one session per port). Returns it."""
+        if port in self.sessions:
+            raise ValueError(f"{port} already has a session")
+        session = Session(port, model, ecu_name, ecu_address, baudrate,
+                          emit=self._emit, **proto_kwargs)
+        self.sessions[port] = session
+        return session
+
+    def remove(self, port):
+        """Stop and forget a port's session."""
+        session = self.sessions.pop(port)
+        session.stop()
+
+    def start_all(self):
+        """Start every session; connections proceed in parallel."""
+        for session in self.sessions.values():
+            session.start()
+
+    def stop_all(self):
+        """Stop every session, all disconnecting in parallel."""
+        for session in self.sessions.values():
+            session._stop.set()
+        for session in self.sessions.values():
+            session.stop()
+
+    def wait_connected(self, timeout=None):
+        """Wait until every session is connected or has failed.
+
+        Returns {port: True/False}.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for session in self.sessions.values():
+            while not session.connected.is_set() and session.running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                session.connected.wait(0.1 if remaining is None else min(remaining, 0.1))
+        return {port: s.connected.is_set() for port, s in self.sessions.items()}
+
+    def _gather(self, futures, timeout):
+        wait(futures.values(), timeout=timeout)
+        results = {}
+        for port, future in futures.items():
+            if not future.done():
+                results[port] = TimeoutError(f"{port}: no result within {timeout} s")
+            elif future.exception() is not None:
+                results[port] = future.exception()
+            else:
+                results[port] = future.result()
+        return results
+
+    def submit_all(self, fn, timeout=None):
+        """Run fn(proto) on every session in parallel.
+
+        Returns {port: result or exception}.
+        """
+        return self._gather(
+            {port: s.submit(fn) for port, s in self.sessions.items()}, timeout)
+
+    def read_faults(self, timeout=None):
+        """Read faults on every session in parallel.
+
+        Returns {port: [FaultRecord] or exception}.
+        """
+        return self._gather(
+            {port: s.read_faults() for port, s in self.sessions.items()}, timeout)
+
+    def start_live(self, rates=None):
+        """Start live data on every connected session."""
+        for session in self.sessions.values():
+            if session.connected.is_set():
+                session.start_live(rates=rates)
+
+    def stop_live(self):
+        for session in self.sessions.values():
+            if session.connected.is_set():
+                session.stop_live()
+
+    def latest(self):
+        """Return {port: {name: Sample}} with the newest live samples."""
+        return {port: s.latest() for port, s in self.sessions.items()}
+
+    def __enter__(self):
+        self.start_all()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_all()
@@ -0,0 +1,138 @@
+"""Whole-car sweep - ident and fault codes from every ECU of a model in turn.
+
+Each module gets a single connection attempt: an absent module costs one
+5-baud init plus the sync timeout instead of MAX_INIT_RETRIES attempts with
+1 s sleeps. Results are streamed as each module finishes, with its time.
+
+The port stays open for the whole sweep: the next module's 5-baud frame is
+scheduled for INIT_IDLE_TIME after the previous EndComm rather than after
+closing and reopening the adapter.
+
+Usage:
+    sweep = CarSweep("/dev/ttyUSB0", "964", budget=60.0)
+    for result in sweep.run():
+        print(result.name, result.part_number, result.faults, result.seconds)
+
+    python -m kwp1281.sweep /dev/ttyUSB0 --model 993 --budget 60
+"""
+
+import sys
+import time
+import argparse
+import threading
+from collections import namedtuple
+
+from .constants import ECUS, BIT_TIME_5BAUD, INIT_IDLE_TIME, SYNC_TIMEOUT
+from .protocol import KWP1281Protocol, ProtocolError
+from .serial_port import KLineError
+
+# faults: list of FaultRecord (None if not read), error: message or None
+SweepResult = namedtuple("SweepResult", "name address part_number faults error seconds")
+
+# Shortest connection attempt: bus idle, 10-bit 5-baud address frame, sync wait
+MIN_VISIT_TIME = INIT_IDLE_TIME + 10 * BIT_TIME_5BAUD + SYNC_TIMEOUT
+
+
+class CarSweep:
+    """Visits every ECU of a model on one K-Line port, one session at a time.
+
+    Args:
+        port: serial port of the K-Line adapter
+        model: key into constants.ECUS ("964", "993", "965")
+        ecus: optional list of (name, address, baudrate) overriding the model
+        budget: total sweep time limit in seconds (None = unbounded); a module
+                is reported as skipped when less than MIN_VISIT_TIME remains
+        retries: connection attempts per module (1 = fail fast)
+        on_result: optional callback(SweepResult), called as results arrive
+        **proto_kwargs: passed to KWP1281Protocol (on_log, local_echo, ...)
+    """
+
+    def __init__(self, port, model, ecus=None, budget=None, retries=1,
+                 on_result=None, **proto_kwargs):
+        self.port = port
+        self.model = model
+        self.ecus = list(ecus or ECUS[model])
+        self.budget = budget
+        self.retries = retries
+        self.on_result = on_result
+        self.proto_kwargs = proto_kwargs
+        self.results = []
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+
+    def stop(self):
+        """Finish the module in progress, then skip the rest."""
+        self._stop.set()
+
+    def run(self):
+        """Sweep all modules, yielding a SweepResult as each one finishes."""
+        self.results = []
+        self._stop.clear()
+        t0 = time.monotonic()
+        proto = KWP1281Protocol(**self.proto_kwargs)
+
+        try:
+            yield from self._sweep(proto, t0)
+        finally:
+            proto.disconnect()
+        self.elapsed = time.monotonic() - t0
+
+    def run_all(self):
+        """Run the whole sweep. Returns the list of SweepResults."""
+        for _ in self.run():
+            pass
+        return self.results
+
+    def _sweep(self, proto, t0):
+        for name, address, baudrate in self.ecus:
+            elapsed = time.monotonic() - t0
+            if self._stop.is_set():
+                result = SweepResult(name, address, "", None, "skipped: sweep stopped", 0.0)
+            elif self.budget is not None and self.budget - elapsed < MIN_VISIT_TIME:
+                result = SweepResult(name, address, "", None, "skipped: sweep budget exhausted", 0.0)
+            else:
+                result = self._visit(proto, name, address, baudrate)
+            self.results.append(result)
+            self.elapsed = time.monotonic() - t0
+            if self.on_result:
+                self.on_result(result)
+            yield result
+
+    def _visit(self, proto, name, address, baudrate):
+        """Connect to one module, read ident and faults, end its session."""
+        t0 = time.monotonic()
+        part_number = ""
+        faults = None
+        error = None
+        try:
+            part_number = proto.connect(self.port, self.model, name, address, baudrate,
+                                        retries=self.retries)
+            faults = proto.read_faults()
+        except (KLineError, ProtocolError, OSError) as e:
+            error = str(e)
+        finally:
+            proto.disconnect(keep_port=True)
+        return SweepResult(name, address, part_number, faults, error, time.monotonic() - t0)
+
+
+def main(argv=None):
+    """Sweep a car and print one line per module plus its faults."""
+    parser = argparse.ArgumentParser(description="Read ident and faults from every ECU")
+    parser.add_argument("port")
+    parser.add_argument("--model", default="964", choices=sorted(ECUS))
+    parser.add_argument("--budget", type=float, help="total time limit in seconds")
+    args = parser.parse_args(argv)
+
+    sweep = CarSweep(args.port, args.model, budget=args.budget)
+    for r in sweep.run():
+        status = r.error or f"{len(r.faults)} fault(s)"
+        print(f"0x{r.address:02X}  {r.name:18s} {r.part_number:16s} {status}  ({r.seconds:.2f} s)")
+        for code, desc, count in r.faults or ():
+            print(f"        #{code}: {desc} (x{count})")
+        sys.stdout.flush()
+    print(f"Sweep finished in {sweep.elapsed:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Adaptive K-Line timing - per-ECU latency percentiles and derived deadlines."""
+
+from collections import deque
+
+from .constants import (
+    CMD_VALUE_REQ, INTERBYTE_TIMEOUT, ADAPTIVE_WINDOW, ADAPTIVE_MIN_SAMPLES,
+    ADAPTIVE_REFRESH, ADAPTIVE_PERCENTILE, ADAPTIVE_FACTOR, ADAPTIVE_MARGIN,
+    ADAPTIVE_MIN_TIMEOUT, ADAPTIVE_TITLES,
+)
+
+
+class LatencyTracker:
+    """Sliding window of latency samples (seconds) with percentile queries."""
+
+    def __init__(self, window=ADAPTIVE_WINDOW):
+        self._samples = deque(maxlen=window)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def clear(self):
+        self._samples.clear()
+
+    def percentile(self, p):
+        """Return the p-th percentile (nearest rank), or None if empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        idx = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+        return ordered[idx]
+
+
+class AdaptiveTiming:
+    """Derives K-Line read deadlines from the latencies of the current ECU.
+
+    Two trackers are kept:
+      ack      - byte written -> next byte read (complement or ECU data byte)
+      response - end of our block -> first byte of the ECU's block, for
+                 ADAPTIVE_TITLES requests only (Value Request, ACK)
+
+    Each deadline is p99 * ADAPTIVE_FACTOR + ADAPTIVE_MARGIN, clamped to
+    [ADAPTIVE_MIN_TIMEOUT, INTERBYTE_TIMEOUT]. Until ADAPTIVE_MIN_SAMPLES have
+    been seen (or with enabled=False) the fixed INTERBYTE_TIMEOUT is used.
+    Deadlines are recomputed every ADAPTIVE_REFRESH samples so the serial
+    timeout stays stable between blocks. A timeout is recorded as a sample
+    at the deadline that expired, which widens the next deadline.
+
+    The learned response deadline only applies to the frequent, uniformly
+    fast ADAPTIVE_TITLES requests. Other commands (ReadFaults, ClearFaults,
+    Login, adaptation, ...) can take the ECU several times longer, and a
+    missed first byte loses the block, so their first byte always gets the
+    full INTERBYTE_TIMEOUT (see response_timeout_for()).
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.ack = LatencyTracker()
+        self.response = LatencyTracker()
+        self._byte_timeout = INTERBYTE_TIMEOUT
+        self._response_timeout = INTERBYTE_TIMEOUT
+        self._pending = 0
+
+    def reset(self):
+        """Forget all samples (new ECU session)."""
+        self.ack.clear()
+        self.response.clear()
+        self._byte_timeout = INTERBYTE_TIMEOUT
+        self._response_timeout = INTERBYTE_TIMEOUT
+        self._pending = 0
+
+    @property
+    def byte_timeout(self):
+        """Deadline for an ACK complement or the next byte of a block."""
+        return self._byte_timeout
+
+    @property
+    def response_timeout(self):
+        """Learned deadline for the first byte of a reply to ADAPTIVE_TITLES."""
+        return self._response_timeout
+
+    def response_timeout_for(self, title):
+        """Deadline for the first byte of the ECU's reply to a `title` block.
+
+        title None (no request sent, e.g. ident blocks) is not adaptive.
+        """
+        if title in ADAPTIVE_TITLES:
+            return self._response_timeout
+        return INTERBYTE_TIMEOUT
+
+    def block_deadline(self, tx_len=4, rx_len=4, title=None):
+        """Worst-case time for sending tx_len bytes and receiving an rx_len block."""
+        return (tx_len + rx_len - 2) * self._byte_timeout + self.response_timeout_for(title)
+
+    def record_ack(self, seconds):
+        self.ack.add(seconds)
+        self._tick()
+
+    def record_response(self, seconds, title=CMD_VALUE_REQ):
+        if title in ADAPTIVE_TITLES:
+            self.response.add(seconds)
+            self._tick()
+
+    def record_timeout(self, response=False, title=CMD_VALUE_REQ):
+        """Record an expired deadline and recompute immediately."""
+        if response:
+            if title not in ADAPTIVE_TITLES:
+                return  # the fixed deadline expired, nothing learned
+            self.response.add(self._response_timeout)
+        else:
+            self.ack.add(self._byte_timeout)
+        self._refresh()
+
+    def snapshot(self):
+        """Return current percentiles and deadlines as a dict (seconds)."""
+        return {
+            "ack_samples": len(self.ack),
+            "ack_p50": self.ack.percentile(50),
+            "ack_p99": self.ack.percentile(ADAPTIVE_PERCENTILE),
+            "response_samples": len(self.response),
+            "response_p50": self.response.percentile(50),
+            "response_p99": self.response.percentile(ADAPTIVE_PERCENTILE),
+            "byte_timeout": self._byte_timeout,
+            "response_timeout": self._response_timeout,
+        }
+
+    def _tick(self):
+        self._pending += 1
+        if self._pending >= ADAPTIVE_REFRESH:
+            self._refresh()
+
+    def _refresh(self):
+        self._pending = 0
+        if not self.enabled:
+            return
+        self._byte_timeout = self._deadline(self.ack)
+        # The ECU never answers a block faster than it ACKs a byte
+        self._response_timeout = max(self._deadline(self.response), self._byte_timeout)
+
+    @staticmethod
+    def _deadline(tracker):
+        if len(tracker) < ADAPTIVE_MIN_SAMPLES:
+            return INTERBYTE_TIMEOUT
+        p = tracker.percentile(ADAPTIVE_PERCENTILE)
+        deadline = round(p * ADAPTIVE_FACTOR + ADAPTIVE_MARGIN, 3)  # whole ms
+        return min(max(deadline, ADAPTIVE_MIN_TIMEOUT), INTERBYTE_TIMEOUT)
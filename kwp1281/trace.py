@@ -0,0 +1,340 @@
+"""Raw K-Line session capture and deterministic replay.
+
+Trace file layout (little-endian):
+    header 16 bytes: magic "KKLTRC01", f8 wall-clock start time
+    events  6 bytes: u4 microseconds since previous event, u1 kind, u1 value
+
+Kinds are TX (byte written), RX (byte read) and INIT (5-baud address).
+
+Capture wraps the pyserial port inside KLineSerial, so every path (single
+byte, block I/O, local echo) is recorded. Replay feeds a trace back through
+the real KWP1281Protocol via ReplayProtocol, at full speed or in real time.
+
+Usage:
+    proto.start_capture("motronic.trc")
+    ...
+    replay = ReplayProtocol("motronic.trc")
+    replay.connect("replay", "964", "Motronic M2.1", 0x10, 8800)
+    replay.read_faults()
+"""
+
+import sys
+import time
+import struct
+
+from .constants import BIT_TIME_5BAUD, CMD_ACK, ETX
+from .serial_port import KLineSerial, KLineError
+from .protocol import KWP1281Protocol
+
+MAGIC = b"KKLTRC01"
+
+TX = 0
+RX = 1
+INIT = 2
+
+_HEADER_FMT = "<8sd"
+_HEADER_SIZE = struct.calcsize(_HEADER_FMT)
+_EVENT = struct.Struct("<IBB")
+_MAX_DELTA = 0xFFFFFFFF
+
+BURST_GAP = 0.003   # s; closer RX events were pending together (e.g. a garbled sync)
+
+_KIND_NAMES = {TX: "TX", RX: "RX", INIT: "INIT"}
+
+
+class ReplayMismatchError(KLineError):
+    """Replayed session diverged from the recorded trace."""
+
+
+# ── Capture ──
+
+class TraceWriter:
+    """Records K-Line bytes with monotonic timestamps into a trace file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "wb")
+        self._f.write(struct.pack(_HEADER_FMT, MAGIC, time.time()))
+        self._buf = bytearray()
+        self._last = time.perf_counter()
+
+    def record(self, kind, data):
+        """Record each byte of data as one event of the given kind."""
+        now = time.perf_counter()
+        delta = min(int((now - self._last) * 1e6), _MAX_DELTA)
+        self._last = now
+        pack = _EVENT.pack
+        for b in data:
+            self._buf += pack(delta, kind, b)
+            delta = 0
+        if len(self._buf) >= 4096:
+            self.flush()
+
+    def record_init(self, address):
+        """Record a 5-baud address init."""
+        self.record(INIT, (address,))
+
+    def flush(self):
+        if self._f is not None and self._buf:
+            self._f.write(self._buf)
+            self._f.flush()
+            self._buf.clear()
+
+    def close(self):
+        if self._f is not None:
+            self.flush()
+            self._f.close()
+            self._f = None
+
+
+class CaptureSerial:
+    """pyserial proxy that records every byte written and read."""
+
+    def __init__(self, ser, writer):
+        self._ser = ser
+        self._writer = writer
+
+    def write(self, data):
+        self._writer.record(TX, data)
+        return self._ser.write(data)
+
+    def read(self, size=1):
+        data = self._ser.read(size)
+        if data:
+            self._writer.record(RX, data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+    def __setattr__(self, name, value):
+        if name in ("_ser", "_writer"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._ser, name, value)
+
+
+def read_trace(path):
+    """Load a trace file.
+
+    Returns (start_wall_time, [(t_seconds, kind, value), ...]) with t
+    relative to the first event.
+    """
+    with open(path, "rb") as f:
+        head = f.read(_HEADER_SIZE)
+        if len(head) < _HEADER_SIZE or head[:8] != MAGIC:
+            raise ValueError(f"{path}: not a K-Line trace")
+        _, start = struct.unpack(_HEADER_FMT, head)
+        raw = f.read()
+
+    events = []
+    t = 0.0
+    usable = len(raw) - len(raw) % _EVENT.size
+    for delta, kind, value in _EVENT.iter_unpack(raw[:usable]):
+        t += delta / 1e6
+        events.append((t, kind, value))
+    if events:
+        t0 = events[0][0]
+        events = [(t - t0, k, v) for t, k, v in events]
+    return start, events
+
+
+# ── Replay ──
+
+class ReplaySerial:
+    """pyserial stand-in that plays back a recorded trace.
+
+    write() checks each byte against the next TX event and raises
+    ReplayMismatchError on divergence. read() returns the consecutive RX
+    events at the cursor (b"" like a timeout when the trace expects a write
+    or has ended). With realtime=True, recorded inter-event delays are kept.
+    """
+
+    def __init__(self, events, realtime=False):
+        self._events = events
+        self._pos = 0
+        self._realtime = realtime
+        self._t0 = None
+        self.timeout = None
+        self.write_timeout = None
+        self.baudrate = 9600
+        self.rts = False
+        self.dtr = False
+        self.is_open = True
+        self.fd = None
+
+    @property
+    def remaining(self):
+        """Number of trace events not yet replayed."""
+        return len(self._events) - self._pos
+
+    def _wait_until(self, t):
+        if not self._realtime:
+            return
+        if self._t0 is None:
+            self._t0 = time.perf_counter() - t
+        delay = self._t0 + t - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _skip_init(self):
+        while self._pos < len(self._events) and self._events[self._pos][1] == INIT:
+            self._pos += 1
+
+    def consume_init(self, address):
+        """Match a 5-baud init of `address` against the next INIT event."""
+        if self._pos >= len(self._events) or self._events[self._pos][1] != INIT:
+            raise ReplayMismatchError(f"Unexpected 5-baud init 0x{address:02X}")
+        t, _, recorded = self._events[self._pos]
+        if recorded != address:
+            raise ReplayMismatchError(
+                f"5-baud address 0x{address:02X}, trace has 0x{recorded:02X}")
+        self._wait_until(t)
+        self._pos += 1
+        # Captured on a pseudo-terminal: the address was also written as a byte
+        if (self._pos < len(self._events)
+                and self._events[self._pos][1:] == (TX, address)):
+            self._pos += 1
+
+    def peek_tx(self, count):
+        """Return the next `count` TX byte values at the cursor (fewer at end)."""
+        out = []
+        for _, kind, value in self._events[self._pos:]:
+            if kind == TX:
+                out.append(value)
+                if len(out) == count:
+                    break
+        return out
+
+    def write(self, data):
+        self._skip_init()
+        for b in data:
+            if self._pos >= len(self._events):
+                raise ReplayMismatchError(f"Write 0x{b:02X} past end of trace")
+            t, kind, value = self._events[self._pos]
+            if kind != TX or value != b:
+                raise ReplayMismatchError(
+                    f"Event {self._pos}: wrote 0x{b:02X}, trace has "
+                    f"{_KIND_NAMES.get(kind, kind)} 0x{value:02X}")
+            self._wait_until(t)
+            self._pos += 1
+        return len(data)
+
+    @property
+    def in_waiting(self):
+        """RX events arriving back to back (< BURST_GAP apart) at the cursor."""
+        events = self._events
+        pos = self._pos
+        prev = events[pos - 1][0] if pos else None
+        count = 0
+        while pos < len(events) and events[pos][1] == RX:
+            t = events[pos][0]
+            if prev is not None and t - prev >= BURST_GAP:
+                break
+            prev = t
+            count += 1
+            pos += 1
+        return count
+
+    def read(self, size=1):
+        self._skip_init()
+        out = bytearray()
+        while len(out) < size and self._pos < len(self._events):
+            t, kind, value = self._events[self._pos]
+            if kind != RX:
+                break
+            self._wait_until(t)
+            out.append(value)
+            self._pos += 1
+        return bytes(out)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+class ReplayKLineSerial(KLineSerial):
+    """KLineSerial bound to a ReplaySerial instead of a real port."""
+
+    def __init__(self, events, realtime=False, **kwargs):
+        super().__init__(**kwargs)
+        self.replay = ReplaySerial(events, realtime=realtime)
+
+    def open(self, port, baudrate=9600):
+        self.replay.is_open = True
+        self._ser = self.replay
+        self._purge()
+
+    def send_5baud_address(self, address, start_at=None):
+        self.replay.consume_init(address)
+        if self.replay._realtime:
+            time.sleep(BIT_TIME_5BAUD * 10)
+        self._purge()
+
+
+class ReplayProtocol(KWP1281Protocol):
+    """KWP1281Protocol running against a recorded trace.
+
+    The keep-alive thread is not started; keep-alive exchanges found in the
+    trace are replayed before the next command instead, so the caller only
+    has to repeat the recorded command sequence.
+    """
+
+    def __init__(self, trace, realtime=False, **kwargs):
+        super().__init__(**kwargs)
+        events = read_trace(trace)[1] if isinstance(trace, str) else trace
+        kline = self._kline
+        self._kline = ReplayKLineSerial(events, realtime=realtime,
+                                        rts_inverted=kline._rts_inverted,
+                                        local_echo=kline._local_echo,
+                                        adaptive_timing=kline.timing.enabled)
+
+    @property
+    def remaining(self):
+        """Number of trace events not yet replayed."""
+        return self._kline.replay.remaining
+
+    def _start_keepalive(self):
+        pass
+
+    def _pause_keepalive(self):
+        super()._pause_keepalive()
+        self._replay_keepalives()
+
+    def disconnect(self, keep_port=False):
+        if self.connected:
+            with self._lock:
+                self._replay_keepalives()
+        super().disconnect(keep_port)
+
+    def _replay_keepalives(self):
+        """Replay recorded keep-alive ACK/ACK exchanges at the cursor."""
+        while self._kline.replay.peek_tx(4) == [0x04, self._counter, CMD_ACK, ETX]:
+            self._send_ack()
+            self._recv_block()
+
+
+def main(argv=None):
+    """Print a trace file, one event per line."""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python -m kwp1281.trace FILE")
+        return 2
+    start, events = read_trace(argv[0])
+    print(f"# {argv[0]}: {len(events)} events, started "
+          f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start))}")
+    for t, kind, value in events:
+        print(f"{t * 1000:10.3f} ms  {_KIND_NAMES.get(kind, kind):4s} {value:02X}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
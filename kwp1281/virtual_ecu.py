@@ -0,0 +1,326 @@
+"""Virtual KWP1281 ECU on a Linux pseudo-terminal, for end-to-end testing.
+
+Unlike DemoProtocol, which fakes the KWP1281Protocol API, this speaks the
+real wire protocol: sync 0x55, keywords, ident blocks, inter-byte
+complements, block counters and the command set, so the whole stack
+(KWP1281Protocol, KLineSerial, keep-alive) runs unmodified against it.
+
+A pty has no modem lines, so KLineSerial sends the 5-baud address as a
+plain byte after the 2 s frame time; the virtual ECU wakes up on it.
+
+Byte times on the wire are modeled from the ECU's baudrate (10 bits per
+byte, e.g. ~1.14 ms at 8800), plus a per-byte and per-block ECU latency.
+The pty shares its termios with the tool's side, so when the tool's port
+runs at another rate than the ECU, bytes are garbled both ways as a real
+UART would read them (serial_port.uart_decode) - enough to exercise
+baudrate detection from the sync byte.
+
+Usage:
+    with VirtualECU("964") as ecu:
+        proto = KWP1281Protocol()
+        proto.connect(ecu.port, "964", "Motronic M2.1", 0x10, 8800)
+
+    python -m kwp1281.virtual_ecu --model 993
+"""
+
+import os
+import sys
+import time
+import tty
+import fcntl
+import select
+import struct
+import argparse
+import threading
+
+from .constants import (
+    CMD_GET_ECU_ID, CMD_VALUE_REQ, CMD_CLEAR_FAULTS, CMD_END_COMM,
+    CMD_READ_FAULTS, CMD_ADC_READ, CMD_ACK, CMD_ACTUATOR, CMD_BASIC_SET,
+    CMD_READ_GROUP, CMD_LOGIN, CMD_READ_ADAPT, CMD_WRITE_ADAPT,
+    RSP_ACK, RSP_NAK, RSP_ASCII_ID, RSP_FAULT_CODES, RSP_BINARY_DATA,
+    RSP_GROUP_DATA, RSP_ADAPT_RESP, RSP_ADC_RESP,
+    ETX, SYNC_BYTE, ECUS, DEMO_PART_NUMBERS, DEMO_BASE_VALUES,
+)
+from .serial_port import uart_decode
+
+KEYWORDS = (0x0B, 0x02)
+
+SYNC_DELAY     = 0.050   # address received -> sync byte (W1)
+KEYWORD_DELAY  = 0.005   # between sync / keyword bytes (W2, W3)
+ACK_LATENCY    = 0.0005  # ECU processing time per byte
+BLOCK_LATENCY  = 0.005   # ECU processing time before a response block
+BYTE_TIMEOUT   = 0.5     # lenient wait for the tool's next byte
+SESSION_TIMEOUT = 5.0    # no block for this long ends the session
+
+TCGETS2 = 0x802C542A     # Linux ioctl: struct termios2 (c_ospeed at offset 40)
+
+DEFAULT_FAULTS = [(21, 0x01), (31, 0x83)]  # (code, status byte)
+
+
+class _SessionEnd(Exception):
+    """Session ended (EndComm, timeout, bad complement or new init)."""
+
+
+class VirtualECU:
+    """One or more simulated KWP1281 ECUs behind a pseudo-terminal.
+
+    Args:
+        model: "964", "993" or "965"; selects the ECUs from constants.ECUS
+        ecus: optional list of (name, address, baudrate) overriding the model
+        wire_timing: model byte times and ECU latencies (False = max speed)
+        echo: echo every tool byte back, like a single-wire interface
+        chain: accept a Value Request in place of the ACK after 0xFE
+        faults: list of (code, status) pairs returned by ReadFaults
+        baud_mismatch: garble bytes when the tool's rate differs from the ECU's
+    """
+
+    def __init__(self, model="964", ecus=None, wire_timing=True, echo=False,
+                 chain=True, faults=None, baud_mismatch=True):
+        self.model = model
+        self.ecus = {addr: (name, baud) for name, addr, baud in (ecus or ECUS[model])}
+        self.wire_timing = wire_timing
+        self.echo = echo
+        self.chain = chain
+        self.faults = list(DEFAULT_FAULTS if faults is None else faults)
+        self.baud_mismatch = baud_mismatch
+        self.values = dict(DEMO_BASE_VALUES)
+        self.adaptation = {}
+        self.stats = {"sessions": 0, "blocks_rx": 0, "blocks_tx": 0}
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+
+        self._address = None
+        self._baud = None           # ECU baudrate while in a session
+        self._byte_time = 0.0
+        self._counter = 0
+        self._last_title = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ── Lifecycle ──
+
+    def start(self):
+        """Serve on a daemon thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.serve, daemon=True, name="virtual-ecu")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the pty."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def serve(self):
+        """Wait for 5-baud addresses and run sessions until stopped."""
+        pending = None
+        while not self._stop.is_set():
+            self._baud = None
+            address = pending if pending is not None else self._rx(timeout=0.1)
+            pending = None
+            if address not in self.ecus:
+                continue
+            try:
+                self._session(address)
+            except _SessionEnd as end:
+                pending = end.args[0] if end.args else None
+            except OSError:
+                break
+
+    # ── Wire ──
+
+    def _sleep(self, seconds):
+        if self.wire_timing and seconds > 0:
+            time.sleep(seconds)
+
+    def _rx(self, timeout):
+        """Read one tool byte, or None on timeout."""
+        r, _, _ = select.select([self._master], [], [], timeout)
+        if not r:
+            return None
+        b = os.read(self._master, 1)[0]
+        if self.echo:
+            os.write(self._master, bytes([b]))
+        self._sleep(self._byte_time)  # the byte's own time on the wire
+        rate = self._tool_baudrate()
+        if rate is not None:
+            data = uart_decode(bytes([b]), rate, self._baud)[0]
+            return data[0] if data else None
+        return b
+
+    def _tx(self, b):
+        self._sleep(self._byte_time)
+        data = bytes([b])
+        rate = self._tool_baudrate()
+        if rate is not None:
+            data = uart_decode(data, self._baud, rate)[0]
+        os.write(self._master, data)
+
+    def _tool_baudrate(self):
+        """The tool port's baudrate if it differs from the session's, else None."""
+        if not self.baud_mismatch or self._baud is None:
+            return None
+        try:
+            buf = fcntl.ioctl(self._master, TCGETS2, bytes(44))
+        except OSError:
+            return None
+        rate = struct.unpack_from("<I", buf, 40)[0]
+        return rate if rate and rate != self._baud else None
+
+    def _send_block(self, title, data=b""):
+        block = bytes([len(data) + 4, self._counter, title]) + bytes(data) + bytes([ETX])
+        self._sleep(BLOCK_LATENCY)
+        last = len(block) - 1
+        for i, b in enumerate(block):
+            self._tx(b)
+            if i < last:
+                ack = self._rx(BYTE_TIMEOUT)
+                if ack != b ^ 0xFF:
+                    raise _SessionEnd()
+        self._counter = (self._counter + 1) & 0xFF
+        self._last_title = title
+        self.stats["blocks_tx"] += 1
+
+    def _recv_block(self):
+        """Receive a tool block. Returns (title, data)."""
+        deadline = time.monotonic() + SESSION_TIMEOUT
+        length = None
+        while length is None:
+            if self._stop.is_set() or time.monotonic() > deadline:
+                raise _SessionEnd()
+            length = self._rx(timeout=0.1)
+        # Tool blocks are short; an ECU address here is a new 5-baud init
+        if length in self.ecus:
+            raise _SessionEnd(length)
+        block = [length]
+        for i in range(1, length):
+            self._sleep(ACK_LATENCY)
+            self._tx(block[-1] ^ 0xFF)
+            b = self._rx(BYTE_TIMEOUT)
+            if b is None:
+                raise _SessionEnd()
+            block.append(b)
+        self._counter = (block[1] + 1) & 0xFF
+        self.stats["blocks_rx"] += 1
+        return block[2], bytes(block[3:-1])
+
+    # ── Session ──
+
+    def _session(self, address):
+        name, baud = self.ecus[address]
+        self._address = address
+        self._baud = baud
+        self._byte_time = 10.0 / baud
+        self._counter = 0
+        self._last_title = None
+        self.stats["sessions"] += 1
+
+        # Sync and keywords
+        self._sleep(SYNC_DELAY)
+        self._tx(SYNC_BYTE)
+        self._sleep(KEYWORD_DELAY)
+        for kw in KEYWORDS:
+            self._tx(kw)
+            if self._rx(BYTE_TIMEOUT) != kw ^ 0xFF:
+                raise _SessionEnd()
+            self._sleep(KEYWORD_DELAY)
+
+        # Ident: one ASCII block, ACKed by the tool, then our ACK
+        self._send_block(RSP_ASCII_ID, self._part_number().encode("ascii"))
+        self._recv_block()
+        self._send_block(RSP_ACK)
+
+        while not self._stop.is_set():
+            title, data = self._recv_block()
+            if title == CMD_END_COMM:
+                raise _SessionEnd()
+            self._dispatch(title, data)
+
+    def _part_number(self):
+        return DEMO_PART_NUMBERS.get(self.model, {}).get(self._address, "XXX.XXX.XXX.XX")
+
+    def _dispatch(self, title, data):
+        if title == CMD_ACK:
+            self._send_block(RSP_ACK)
+        elif title == CMD_VALUE_REQ and len(data) >= 3:
+            if self._last_title == RSP_BINARY_DATA and not self.chain:
+                self._send_block(RSP_NAK, b"\x00")
+            else:
+                self._send_block(RSP_BINARY_DATA, bytes([self._value(data[2])]))
+        elif title == CMD_READ_FAULTS:
+            payload = bytes(b for code, status in self.faults for b in (code, status))
+            self._send_block(RSP_FAULT_CODES, payload or b"\x00")
+        elif title == CMD_CLEAR_FAULTS:
+            self.faults.clear()
+            self._send_block(RSP_ACK)
+        elif title == CMD_ADC_READ and data:
+            v = self._value(data[0]) * 4
+            self._send_block(RSP_ADC_RESP, bytes([v >> 8, v & 0xFF]))
+        elif title == CMD_READ_GROUP and data:
+            payload = bytearray()
+            for i in range(4):
+                payload += bytes([1, self._value(data[0] + i), 0x00])
+            self._send_block(RSP_GROUP_DATA, bytes(payload))
+        elif title == CMD_READ_ADAPT and data:
+            v = self.adaptation.get(data[0], 0x8000)
+            self._send_block(RSP_ADAPT_RESP, bytes([data[0], v >> 8, v & 0xFF]))
+        elif title == CMD_WRITE_ADAPT and len(data) >= 3:
+            self.adaptation[data[0]] = (data[1] << 8) | data[2]
+            self._send_block(RSP_ACK)
+        elif title in (CMD_LOGIN, CMD_ACTUATOR, CMD_BASIC_SET):
+            self._send_block(RSP_ACK)
+        elif title == CMD_GET_ECU_ID:
+            self._send_block(RSP_ASCII_ID, self._part_number().encode("ascii"))
+        else:
+            self._send_block(RSP_NAK, b"\x00")
+
+    def _value(self, register):
+        """Raw register value: demo base value with a slow deterministic wobble."""
+        base = self.values.get(register & 0xFF, 128)
+        wobble = (self.stats["blocks_tx"] // 8) % 5 - 2
+        return max(0, min(255, base + wobble))
+
+
+def main(argv=None):
+    """Run a virtual ECU until interrupted, printing its pty path."""
+    parser = argparse.ArgumentParser(description="Virtual KWP1281 ECU on a pty")
+    parser.add_argument("--model", default="964", choices=sorted(ECUS))
+    parser.add_argument("--no-timing", action="store_true", help="no modeled byte times")
+    parser.add_argument("--echo", action="store_true", help="echo tool bytes (single wire)")
+    parser.add_argument("--no-chain", action="store_true",
+                        help="refuse chained Value Requests")
+    args = parser.parse_args(argv)
+
+    ecu = VirtualECU(args.model, wire_timing=not args.no_timing, echo=args.echo,
+                     chain=not args.no_chain)
+    print(f"Virtual {args.model} ECUs on {ecu.port}:")
+    for addr, (name, baud) in sorted(ecu.ecus.items()):
+        print(f"  0x{addr:02X}  {name:18s} {baud} baud")
+    sys.stdout.flush()
+    try:
+        ecu.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ecu.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())